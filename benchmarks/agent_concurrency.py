@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+from benchmarks.stand_ins import ChatCompletionServerHandler, start_server_process
+
+
+def configure_environment(llm_url):
+    os.environ["OPENAI_BASE_URL"] = f"{llm_url}/v1"
+    os.environ["OPENAI_API_BASE"] = f"{llm_url}/v1"
+    os.environ["LITELLM_LOCAL_MODEL_COST_MAP"] = "True"
+    os.environ["LANGSMITH_TRACING"] = "false"
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    for key in ["OPENAI_API_KEY", "GROQ_API_KEY", "LANGSMITH_API_KEY"]:
+        os.environ.setdefault(key, "stand-in")
+
+
+def register_models():
+    """Make sure litellm routes the agents' default model to the OpenAI provider with its offline model map."""
+    import litellm
+
+    litellm.register_model({
+        "gpt-4.1": {"litellm_provider": "openai", "mode": "chat", "input_cost_per_token": 2e-06, "output_cost_per_token": 8e-06}
+    })
+
+
+def blocking_client():
+    """Client shaped like the agents' instructor client but running the synchronous litellm `completion`.
+
+    This reproduces the previous behaviour where every LLM call blocked the event loop.
+    """
+    import instructor
+    from litellm import completion
+
+    sync_client = instructor.from_litellm(completion)
+
+    async def create_with_completion(**kwargs):
+        return sync_client.chat.completions.create_with_completion(**kwargs)
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create_with_completion=create_with_completion)))
+
+
+async def run_concurrent(graph, concurrency, round_id):
+    from api.rag.graph import shopping_cart_tool_descriptions
+
+    async def run_one(i):
+        thread_id = f"benchmark-{round_id}-{i}"
+        initial_state = {
+            "messages": [{"role": "user", "content": "Hello, what can you do?"}],
+            "user_id": thread_id,
+            "cart_id": thread_id,
+            "product_qa_available_tools": [],
+            "shopping_cart_available_tools": shopping_cart_tool_descriptions,
+        }
+        return await graph.ainvoke(initial_state, config={"configurable": {"thread_id": thread_id}})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(i) for i in range(concurrency)))
+    return concurrency / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent graph throughput with concurrent requests against a mock LLM server.")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    server, llm_url = start_server_process(ChatCompletionServerHandler)
+    configure_environment(llm_url)
+
+    register_models()
+
+    from langgraph.checkpoint.memory import InMemorySaver
+    from api.rag import agents
+    from api.rag.graph import workflow
+
+    graph = workflow.compile(checkpointer=InMemorySaver())
+    async_client = agents.client
+
+    print(f"Mock LLM at {llm_url}, {ChatCompletionServerHandler.latency * 1000:.0f} ms per call, "
+          f"{args.concurrency} concurrent requests\n")
+    print(f"{'client':>10} | {'req/s':>8}")
+
+    for name, client in [("blocking", blocking_client()), ("async", async_client)]:
+        agents.client = client
+        results = [asyncio.run(run_concurrent(graph, args.concurrency, f"{name}-{i}")) for i in range(args.rounds)]
+        print(f"{name:>10} | {max(results):>8.1f}")
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+
+
+COLLECTION_PREFIX = "benchmark-profile"
+
+
+def configure_environment(qdrant_url):
+    os.environ["QDRANT_URL"] = qdrant_url
+    os.environ["LANGSMITH_TRACING"] = "false"
+    for key in ["OPENAI_API_KEY", "GROQ_API_KEY", "LANGSMITH_API_KEY"]:
+        os.environ.setdefault(key, "stand-in")
+
+
+def synthetic_vectors(num_points, dim, clusters=200, seed=0):
+    """Unit vectors around random cluster centres, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(clusters, size=num_points)] + 0.6 * rng.standard_normal((num_points, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def source_vectors(client, collection_name, num_points):
+    vectors = []
+    offset = None
+    while len(vectors) < num_points:
+        points, offset = client.scroll(collection_name, limit=256, offset=offset, with_payload=False, with_vectors=[""])
+        vectors.extend(point.vector[""] if isinstance(point.vector, dict) else point.vector for point in points)
+        if offset is None:
+            break
+    vectors = np.asarray(vectors[:num_points], dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def estimate_memory_mb(profile, num_points, dim):
+    """Estimated RAM and disk for the dense vectors and the HNSW graph of a profile.
+
+    Computed from the profile settings, not read from Qdrant. Level 0 of the graph keeps up to 2 * m links of 4 bytes per point. Quantized vectors
+    take 1 byte (scalar) or 1 bit (binary) per dimension and stay in RAM with `always_ram`.
+    """
+    original = num_points * dim * 4
+    graph = num_points * profile["hnsw"]["m"] * 2 * 4
+
+    quantization = profile.get("quantization") or {}
+    quantized = {"scalar": num_points * dim, "binary": num_points * dim / 8}.get(quantization.get("type"), 0)
+
+    ram = graph
+    ram += 0 if profile["on_disk"] else original
+    ram += quantized if quantization.get("always_ram") else 0
+
+    return ram / 2**20, (original + quantized + graph) / 2**20
+
+
+def storage_size_mb(storage_dir, collection_name):
+    """Measured size of a collection in the Qdrant storage directory, None if the directory is not mounted here."""
+    collection_dir = os.path.join(storage_dir, "collections", collection_name)
+    if not os.path.isdir(collection_dir):
+        return None
+
+    size = 0
+    for root, _, files in os.walk(collection_dir):
+        size += sum(os.path.getsize(os.path.join(root, name)) for name in files if os.path.isfile(os.path.join(root, name)))
+    return size / 2**20
+
+
+def wait_until_indexed(client, collection_name, timeout=600):
+    """Wait for the optimizer to finish building the HNSW graph and quantized vectors."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(1)
+        if client.get_collection(collection_name).status == "green":
+            return
+
+
+def measure(client, collection_name, vectors, queries, profile, top_k):
+    from qdrant_client.models import SearchParams, QuantizationSearchParams
+
+    search = profile["search"]
+    params = SearchParams(
+        hnsw_ef=search["hnsw_ef"] or None,
+        quantization=QuantizationSearchParams(rescore=search["rescore"], oversampling=search["oversampling"]),
+    )
+
+    # Ground truth is brute force over the float32 vectors.
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :top_k]
+
+    recalls = []
+    latencies = []
+    for query, expected in zip(queries, exact):
+        start = time.perf_counter()
+        response = client.query_points(collection_name, query=query.tolist(), search_params=params, limit=top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len({point.id for point in response.points} & set(expected.tolist())) / top_k)
+
+    latencies.sort()
+    return statistics.mean(recalls), statistics.median(latencies), latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall, latency, disk size and estimated memory of each collection profile in ingestion/profiles.yaml.")
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--source", default=None, help="Sample vectors from this collection instead of generating them")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--profiles", nargs="+", default=None)
+    parser.add_argument("--scale", type=int, default=10, help="Catalog growth factor for the estimated sizing columns")
+    parser.add_argument("--storage-dir", default="qdrant_storage", help="Qdrant storage directory, as mounted by docker-compose, for the measured disk column")
+    args = parser.parse_args()
+
+    configure_environment(args.qdrant_url)
+
+    from qdrant_client.models import PointStruct
+    from api.core.qdrant import get_qdrant_client
+    from ingestion.provision import load_profiles, create_collection
+
+    client = get_qdrant_client()
+    profiles = load_profiles()
+    dim = profiles["vector_size"]
+
+    vectors = source_vectors(client, args.source, args.points) if args.source else synthetic_vectors(args.points, dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(len(vectors), size=args.queries)] + 0.3 * rng.standard_normal((args.queries, dim)).astype(np.float32) / np.sqrt(dim)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    # Size the catalog from the whole source collection, not just the sample.
+    catalog_size = client.count(args.source).count if args.source else len(vectors)
+
+    print(f"{len(vectors)} vectors from {args.source or 'synthetic clusters'}, {args.queries} queries, recall@{args.top_k} against brute force")
+    print(f"disk MB is measured in {args.storage_dir}, est. columns are computed from the profile settings\n")
+    print(f"{'profile':>14} | {'recall':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'disk MB':>8} | {'est. RAM MB':>11} | {f'est. RAM MB x{args.scale}':>16} | {f'est. disk MB x{args.scale}':>17}")
+
+    for profile_name in args.profiles or list(profiles["profiles"]):
+        profile = profiles["profiles"][profile_name]
+        collection_name = f"{COLLECTION_PREFIX}-{profile_name}"
+
+        if client.collection_exists(collection_name):
+            client.delete_collection(collection_name)
+        create_collection(client, collection_name, "reviews", profile_name, profiles=profiles)
+
+        client.upload_points(
+            collection_name,
+            points=(PointStruct(id=i, vector=vector.tolist()) for i, vector in enumerate(vectors)),
+            batch_size=256,
+            wait=True,
+        )
+        wait_until_indexed(client, collection_name)
+
+        recall, p50, p95 = measure(client, collection_name, vectors, queries, profile, args.top_k)
+        disk = storage_size_mb(args.storage_dir, collection_name)
+        disk = "n/a" if disk is None else f"{disk:.1f}"
+        ram, _ = estimate_memory_mb(profile, len(vectors), dim)
+        scaled_ram, scaled_disk = estimate_memory_mb(profile, catalog_size * args.scale, dim)
+        print(f"{profile_name:>14} | {recall:>7.3f} | {p50:>7.2f} | {p95:>7.2f} | {disk:>8} | {ram:>11.1f} | {scaled_ram:>16.1f} | {scaled_disk:>17.1f}")
+
+        client.delete_collection(collection_name)
+
+
+if __name__ == "__main__":
+    main()
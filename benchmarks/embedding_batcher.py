@@ -0,0 +1,75 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from openai import OpenAI
+
+from api.core.embedding_batcher import EmbeddingBatcher
+from benchmarks.stand_ins import EmbeddingServerHandler, start_server_process
+
+
+MODEL = "text-embedding-3-small"
+REQUESTS_PER_RUN = 300
+CONCURRENCY_LEVELS = [1, 10, 100]
+
+
+class CountingEmbeddingClient:
+    """Counts upstream embedding calls made by the benchmarked code path."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+
+    def __call__(self, texts, model):
+        self.calls += 1
+        response = self.client.embeddings.create(input=texts, model=model)
+        return [item.embedding for item in response.data], response.usage.total_tokens
+
+
+def run_threads(embed_one, concurrency):
+    texts = [f"wireless earphones with noise cancelling {i}" for i in range(REQUESTS_PER_RUN)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(embed_one, texts))
+    return REQUESTS_PER_RUN / (time.perf_counter() - start)
+
+
+async def run_asyncio(batcher, concurrency):
+    texts = [f"laptop bag with shoulder strap {i}" for i in range(REQUESTS_PER_RUN)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed_one(text):
+        async with semaphore:
+            return await batcher.aembed(text, MODEL)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(embed_one(text) for text in texts))
+    return REQUESTS_PER_RUN / (time.perf_counter() - start)
+
+
+def main():
+    server, url = start_server_process(EmbeddingServerHandler)
+    client = OpenAI(base_url=f"{url}/v1", api_key="stand-in")
+
+    print(f"Stand-in embedding server at {url}, "
+          f"{EmbeddingServerHandler.base_latency * 1000:.0f} ms per call, {REQUESTS_PER_RUN} requests per run\n")
+    print(f"{'concurrency':>11} | {'unbatched req/s':>15} | {'batched req/s':>13} | {'batched asyncio req/s':>21} | {'batched calls':>13}")
+
+    for concurrency in CONCURRENCY_LEVELS:
+        embed_texts = CountingEmbeddingClient(client)
+        unbatched = run_threads(lambda text: embed_texts([text], MODEL), concurrency)
+
+        embed_texts = CountingEmbeddingClient(client)
+        batcher = EmbeddingBatcher(embed_texts, window_ms=5.0, max_batch_size=256)
+        batched = run_threads(lambda text: batcher.embed(text, MODEL), concurrency)
+        batched_async = asyncio.run(run_asyncio(batcher, concurrency))
+        batcher.close()
+
+        print(f"{concurrency:>11} | {unbatched:>15.1f} | {batched:>13.1f} | {batched_async:>21.1f} | {embed_texts.calls:>13}")
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+from benchmarks.agent_concurrency import configure_environment
+from benchmarks.stand_ins import start_mcp_server_process
+
+
+async def measure(mcp_tool_node, state, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await mcp_tool_node(state)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+async def run(server_url, tool_calls, iterations):
+    from api.core.config import config
+    from api.rag.utils.mcp_pool import mcp_session_pool
+    from api.rag.utils.utils import mcp_tool_node
+
+    calls = [
+        SimpleNamespace(server=server_url, name="get_formatted_item_context", arguments={"query": "wireless earphones"}),
+        SimpleNamespace(server=server_url, name="get_formatted_reviews_context", arguments={"query": "battery life", "item_list": ["B000000000"]}),
+    ]
+    state = SimpleNamespace(mcp_tool_calls=[calls[i % len(calls)] for i in range(tool_calls)])
+
+    # Open the pooled sessions up front so only the tool phase is measured.
+    await mcp_tool_node(state)
+
+    default_concurrency = config.MCP_TOOL_CALL_CONCURRENCY
+    config.MCP_TOOL_CALL_CONCURRENCY = 1
+    sequential = await measure(mcp_tool_node, state, iterations)
+    config.MCP_TOOL_CALL_CONCURRENCY = default_concurrency
+    concurrent = await measure(mcp_tool_node, state, iterations)
+
+    await mcp_session_pool.close()
+    return sequential, concurrent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of mcp_tool_node with sequential vs concurrent tool calls against a stand-in MCP server.")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    server, server_url = start_mcp_server_process(args.latency)
+    configure_environment("http://127.0.0.1:9")
+
+    print(f"Stand-in MCP server at {server_url}, {args.latency * 1000:.0f} ms per tool call\n")
+    print(f"{'tool calls':>10} | {'sequential ms':>13} | {'concurrent ms':>13}")
+
+    for tool_calls in [1, 2, 3]:
+        sequential, concurrent = asyncio.run(run(server_url, tool_calls, args.iterations))
+        print(f"{tool_calls:>10} | {sequential:>13.1f} | {concurrent:>13.1f}")
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
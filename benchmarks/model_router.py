@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+from benchmarks.agent_concurrency import configure_environment, register_models
+from benchmarks.stand_ins import ChatCompletionServerHandler, start_server_process
+
+
+PRIMARY = "gpt-4.1"
+FALLBACK = "groq/llama-3.3-70b-versatile"
+
+
+class SlowTailHandler(ChatCompletionServerHandler):
+    """Healthy primary with a slow tail, 10% of its calls take 2 s."""
+    model_behaviour = {
+        "gpt-4.1": {"latency": 0.2, "slow_rate": 0.1, "slow_latency": 2.0},
+        "llama-3.3-70b-versatile": {"latency": 0.3},
+    }
+
+
+class FailingPrimaryHandler(ChatCompletionServerHandler):
+    """Primary that fails every call after 0.5 s."""
+    model_behaviour = {
+        "gpt-4.1": {"latency": 0.5, "error_rate": 1.0},
+        "llama-3.3-70b-versatile": {"latency": 0.3},
+    }
+
+
+class StalledPrimaryHandler(ChatCompletionServerHandler):
+    """Primary that answers every call, but only after 2 s, so hedged calls always beat it."""
+    model_behaviour = {
+        "gpt-4.1": {"latency": 2.0},
+        "llama-3.3-70b-versatile": {"latency": 0.3},
+    }
+
+
+async def measure(node, calls, concurrency):
+    from langchain_core.messages import HumanMessage
+
+    state = SimpleNamespace(messages=[HumanMessage(content="Hello, what can you do?")], coordinator_iteration=0)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed_call():
+        async with semaphore:
+            start = time.perf_counter()
+            await node(state)
+            return (time.perf_counter() - start) * 1000
+
+    latencies = sorted(await asyncio.gather(*(timed_call() for _ in range(calls))))
+    return statistics.median(latencies), latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coordinator agent latency with the plain fallback loop vs the model router, against mock model endpoints.")
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--hedge-after-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    scenarios = [
+        ("slow tail", SlowTailHandler),
+        ("failing primary", FailingPrimaryHandler),
+        ("stalled primary", StalledPrimaryHandler),
+    ]
+    servers = {name: start_server_process(handler) for name, handler in scenarios}
+    configure_environment(next(iter(servers.values()))[1])
+    register_models()
+
+    import litellm
+    litellm.suppress_debug_info = True
+
+    from api.rag import agents
+    from api.rag.utils.model_router import ModelRouter
+
+    # Without a circuit breaker or hedging the router behaves like the previous try/except loop.
+    routers = [
+        ("fallback loop", lambda: ModelRouter(failure_threshold=10**9)),
+        ("circuit breaker", lambda: ModelRouter(failure_threshold=3, cooldown_seconds=30.0)),
+        (f"hedge {args.hedge_after_ms:.0f} ms", lambda: ModelRouter(failure_threshold=3, cooldown_seconds=30.0, hedge_after_ms=args.hedge_after_ms)),
+    ]
+
+    print(f"{args.calls} coordinator calls, {args.concurrency} concurrent, primary {PRIMARY}, fallback {FALLBACK}\n")
+    print(f"{'scenario':>16} | {'router':>16} | {'p50 ms':>8} | {'p95 ms':>8} | {'primary calls':>13} | {'fallback calls':>14} | {'primary opens':>13}")
+
+    for scenario, _ in scenarios:
+        llm_url = servers[scenario][1]
+        os.environ["OPENAI_BASE_URL"] = f"{llm_url}/v1"
+        os.environ["OPENAI_API_BASE"] = f"{llm_url}/v1"
+        os.environ["GROQ_API_BASE"] = f"{llm_url}/v1"
+
+        for router_name, make_router in routers:
+            agents.model_router = make_router()
+            p50, p95 = asyncio.run(measure(agents.coordinator_agent_node, args.calls, args.concurrency))
+            stats = agents.model_router.stats()["models"]
+            primary_calls = stats.get(PRIMARY, {}).get("calls", 0)
+            fallback_calls = stats.get(FALLBACK, {}).get("calls", 0)
+            primary_opens = stats.get(PRIMARY, {}).get("circuit_opens", 0)
+            print(f"{scenario:>16} | {router_name:>16} | {p50:>8.1f} | {p95:>8.1f} | {primary_calls:>13} | {fallback_calls:>14} | {primary_opens:>13}")
+
+    for process, _ in servers.values():
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.stand_ins import EmbeddingServerHandler, start_server_process, fake_embedding, EMBEDDING_DIM
+
+
+COLLECTION_NAME = "benchmark-items"
+QUERY = "wireless earphones with noise cancelling"
+
+
+def configure_environment(qdrant_url, embedding_url):
+    os.environ["QDRANT_URL"] = qdrant_url
+    os.environ["QDRANT_COLLECTION_NAME_ITEMS"] = COLLECTION_NAME
+    os.environ["OPENAI_BASE_URL"] = f"{embedding_url}/v1"
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    for key in ["OPENAI_API_KEY", "GROQ_API_KEY", "LANGSMITH_API_KEY"]:
+        os.environ.setdefault(key, "stand-in")
+    os.environ.setdefault("EMBEDDING_MODEL", "text-embedding-3-small")
+    os.environ["LANGSMITH_TRACING"] = "false"
+
+
+def seed_collection(client, num_points):
+    from qdrant_client.models import VectorParams, Distance, PointStruct, PayloadSchemaType, SparseVectorParams, Modifier
+    from api.core.sparse_encoder import BM25SparseEncoder
+
+    if client.collection_exists(COLLECTION_NAME):
+        client.delete_collection(COLLECTION_NAME)
+
+    client.create_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE),
+        sparse_vectors_config={"bm25": SparseVectorParams(modifier=Modifier.IDF)},
+    )
+    client.create_payload_index(COLLECTION_NAME, field_name="text", field_schema=PayloadSchemaType.TEXT)
+
+    words = ["wireless", "earphones", "laptop", "bag", "charger", "cable", "tablet", "red", "noise", "cancelling"]
+    rng = np.random.default_rng(0)
+    sparse_encoder = BM25SparseEncoder(avg_doc_length=8)
+    points = []
+    for i in range(num_points):
+        text = " ".join(rng.choice(words, size=8))
+        points.append(PointStruct(
+            id=i,
+            vector={"": fake_embedding(text).tolist(), "bm25": sparse_encoder.encode_document(text)},
+            payload={"text": text, "parent_asin": f"B{i:09d}"}
+        ))
+    client.upload_points(COLLECTION_NAME, points=points, batch_size=256, wait=True)
+
+
+def measure(fn, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of retrieve_item_context with a per-call vs a shared Qdrant client.")
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    server, embedding_url = start_server_process(EmbeddingServerHandler)
+    configure_environment(args.qdrant_url, embedding_url)
+
+    from qdrant_client import QdrantClient
+    from api.core.config import config
+    from api.core import qdrant
+    from api.rag import tools
+
+    seed_collection(qdrant.get_qdrant_client(), args.points)
+
+    # Warm the in-process embedding cache so only the Qdrant round-trip is measured.
+    tools.get_embedding(QUERY)
+
+    per_call = lambda: QdrantClient(url=config.QDRANT_URL)
+
+    tools.get_qdrant_client = per_call
+    before = measure(lambda: tools.retrieve_item_context(QUERY), args.iterations)
+
+    tools.get_qdrant_client = qdrant.get_qdrant_client
+    after = measure(lambda: tools.retrieve_item_context(QUERY), args.iterations)
+
+    print(f"retrieve_item_context against {args.qdrant_url}, {args.points} points, {args.iterations} calls\n")
+    print(f"{'client':>16} | {'p50 ms':>8} | {'p95 ms':>8}")
+    print(f"{'per-call client':>16} | {before[0]:>8.2f} | {before[1]:>8.2f}")
+    print(f"{'shared client':>16} | {after[0]:>8.2f} | {after[1]:>8.2f}")
+
+    qdrant.get_qdrant_client().delete_collection(COLLECTION_NAME)
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import base64
+import hashlib
+import json
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+EMBEDDING_DIM = 1536
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Deterministic unit vector for a text, stands in for a real embedding model."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector
+
+
+def encode_embedding(vector: np.ndarray, encoding_format: str):
+    if encoding_format == "base64":
+        return base64.b64encode(vector.tobytes()).decode("ascii")
+    return vector.tolist()
+
+
+class EmbeddingServerHandler(BaseHTTPRequestHandler):
+    """OpenAI compatible `POST /v1/embeddings` with a fixed per-call and per-input latency.
+
+    Supports both `float` and `base64` encoding formats, the OpenAI SDK asks for base64 by default.
+    """
+
+    base_latency = 0.05
+    per_input_latency = 0.0002
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+
+        time.sleep(self.base_latency + self.per_input_latency * len(texts))
+
+        tokens = sum(len(text.split()) for text in texts)
+        response = json.dumps({
+            "object": "list",
+            "model": body["model"],
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": encode_embedding(fake_embedding(text), body.get("encoding_format", "float"))
+                }
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(handler_class, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start a stand-in HTTP server on a background thread, port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def _serve(handler_class, port_queue):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server_process(handler_class) -> tuple[multiprocessing.Process, str]:
+    """Start a stand-in HTTP server in a child process so it does not share the GIL with the client."""
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(handler_class, port_queue), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+
+
+class ChatCompletionServerHandler(BaseHTTPRequestHandler):
+    """OpenAI compatible `POST /v1/chat/completions` that answers structured-output tool calls.
+
+    The tool arguments are looked up by the name of the requested response model in
+    `responses`, so the agents' instructor clients get a valid object back.
+
+    `model_behaviour` overrides the latency per requested model and injects slow calls
+    and failures: `{"latency": s, "slow_rate": p, "slow_latency": s, "error_rate": p}`.
+    A failed call answers with a 500 after its latency.
+    """
+
+    latency = 0.2
+    model_behaviour = {}
+    responses = {
+        "CoordinatorAgentResponse": {"next_agent": "", "plan": [], "final_answer": True, "answer": "Hello! How can I help you today?"},
+        "ProductQAAgentResponse": {"answer": "We have several earphones in stock.", "tool_calls": [], "final_answer": True, "retrieved_context_ids": []},
+        "ShoppingCartAgentResponse": {"answer": "Your cart is empty.", "tool_calls": [], "final_answer": True},
+    }
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        tool_name = body["tools"][0]["function"]["name"] if body.get("tools") else ""
+        behaviour = self.model_behaviour.get(body["model"], {})
+
+        latency = behaviour.get("latency", self.latency)
+        if random.random() < behaviour.get("slow_rate", 0.0):
+            latency = behaviour["slow_latency"]
+        time.sleep(latency)
+
+        if random.random() < behaviour.get("error_rate", 0.0):
+            error = json.dumps({"error": {"message": "Injected failure", "type": "server_error"}}).encode("utf-8")
+            self.send_response(500)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(error)))
+            self.end_headers()
+            self.wfile.write(error)
+            return
+
+        response = json.dumps({
+            "id": "chatcmpl-stand-in",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": "call_0",
+                        "type": "function",
+                        "function": {"name": tool_name, "arguments": json.dumps(self.responses.get(tool_name, {}))},
+                    }],
+                },
+            }],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve_mcp(port, latency):
+    import asyncio
+    from fastmcp import FastMCP
+
+    mcp = FastMCP("stand-in")
+
+    @mcp.tool()
+    async def get_formatted_item_context(query: str, top_k: int = 5) -> str:
+        """Stand-in for the items MCP server tool that answers after a fixed latency."""
+        await asyncio.sleep(latency)
+        return f"- ID: B000000000, rating: 4.5, description: {query}"
+
+    @mcp.tool()
+    async def get_formatted_reviews_context(query: str, item_list: list, top_k: int = 15) -> str:
+        """Stand-in for the reviews MCP server tool that answers after a fixed latency."""
+        await asyncio.sleep(latency)
+        return f"- ID: {item_list[0] if item_list else ''}, review: {query}"
+
+    mcp.run(transport="http", host="127.0.0.1", port=port, log_level="warning", show_banner=False)
+
+
+def start_mcp_server_process(latency: float = 0.2) -> tuple[multiprocessing.Process, str]:
+    """Start a stand-in MCP server with fixed-latency tools in a child process and wait until it accepts connections."""
+    port = free_port()
+    process = multiprocessing.Process(target=_serve_mcp, args=(port, latency), daemon=True)
+    process.start()
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    return process, f"http://127.0.0.1:{port}/mcp"
@@ -1,5 +1,6 @@
 from langsmith import Client
 from time import sleep
+import asyncio
 
 from src.api.rag.agents import coordinator_agent_node
 from src.api.rag.graph import State
@@ -9,6 +10,13 @@ from src.api.core.config import config
 ACC_THRESHOLD = 0.7
 SLEEP_TIME = 5
 
+# USD per 1M input and output tokens.
+MODEL_PRICES = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "groq/llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
 ls_client = Client(api_key=config.LANGSMITH_API_KEY)
 
 
@@ -36,8 +44,43 @@ def next_agent_evaluator_groq_llama_3_3_70b_versatile(run, example):
     return next_agent_match and final_answer_match
 
 
+def next_agent_evaluator_cascade(run, example):
+
+    next_agent_match = run.outputs["next_agent"] == example.outputs["next_agent"]
+    final_answer_match = run.outputs["coordinator_final_answer"] == example.outputs["coordinator_final_answer"]
+
+    return next_agent_match and final_answer_match
+
+
+def usage_report(experiment_name):
+    """Mean latency, token cost and escalation rate of the coordinator runs of an experiment."""
+    runs = list(ls_client.list_runs(project_name=experiment_name, filter='eq(name, "coordinator_agent")'))
+
+    latencies = []
+    cost = 0.0
+    tokens = 0
+    escalations = 0
+
+    for run in runs:
+        metadata = (run.extra or {}).get("metadata", {})
+        if run.end_time:
+            latencies.append((run.end_time - run.start_time).total_seconds() * 1000)
+        for model, usage in metadata.get("model_usage", {}).items():
+            input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+            cost += (usage["input_tokens"] * input_price + usage["output_tokens"] * output_price) / 1_000_000
+            tokens += usage["total_tokens"]
+        escalations += metadata.get("cascade", {}).get("escalated", False)
+
+    return {
+        "mean_latency_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "tokens": tokens,
+        "cost_usd": cost,
+        "escalation_rate": escalations / len(runs) if runs else 0.0,
+    }
+
+
 results_gpt_4_1 = ls_client.evaluate(
-    lambda x: coordinator_agent_node(State(messages=x["messages"]), models=["gpt-4.1"]),
+    lambda x: asyncio.run(coordinator_agent_node(State(messages=x["messages"]), models=["gpt-4.1"], cascade_models=[])),
     data="coordinator-evaluation-dataset",
     evaluators=[
         next_agent_evaluator_gpt_4_1
@@ -46,7 +89,7 @@ results_gpt_4_1 = ls_client.evaluate(
 )
 
 results_gpt_4_1_mini = ls_client.evaluate(
-    lambda x: coordinator_agent_node(State(messages=x["messages"]), models=["gpt-4.1-mini"]),
+    lambda x: asyncio.run(coordinator_agent_node(State(messages=x["messages"]), models=["gpt-4.1-mini"], cascade_models=[])),
     data="coordinator-evaluation-dataset",
     evaluators=[
         next_agent_evaluator_gpt_4_1_mini
@@ -56,7 +99,7 @@ results_gpt_4_1_mini = ls_client.evaluate(
 
 
 results_groq_llama_3_3_70b_versatile = ls_client.evaluate(
-    lambda x: coordinator_agent_node(State(messages=x["messages"]), models=["groq/llama-3.3-70b-versatile"]),
+    lambda x: asyncio.run(coordinator_agent_node(State(messages=x["messages"]), models=["groq/llama-3.3-70b-versatile"], cascade_models=[])),
     data="coordinator-evaluation-dataset",
     evaluators=[
         next_agent_evaluator_groq_llama_3_3_70b_versatile
@@ -64,6 +107,15 @@ results_groq_llama_3_3_70b_versatile = ls_client.evaluate(
     experiment_prefix="groq/llama-3.3-70b-versatile"
 )
 
+results_cascade = ls_client.evaluate(
+    lambda x: asyncio.run(coordinator_agent_node(State(messages=x["messages"]), models=["gpt-4.1"], cascade_models=["gpt-4.1-mini"])),
+    data="coordinator-evaluation-dataset",
+    evaluators=[
+        next_agent_evaluator_cascade
+    ],
+    experiment_prefix="cascade-gpt-4.1-mini-gpt-4.1"
+)
+
 print(f"Sleeping for {SLEEP_TIME} seconds...")
 sleep(SLEEP_TIME)
 
@@ -79,26 +131,41 @@ results_resp_groq_llama_3_3_70b_versatile = ls_client.read_project(
     project_name=results_groq_llama_3_3_70b_versatile.experiment_name, include_stats=True
 )
 
+results_resp_cascade = ls_client.read_project(
+    project_name=results_cascade.experiment_name, include_stats=True
+)
+
 
 output_message = "\n"
 
 avg_metrics = []
 error_count = 0
 
+usage_message = f"\n{'experiment':>30} | {'accuracy':>8} | {'mean ms':>8} | {'tokens':>8} | {'cost USD':>9} | {'escalated':>9}\n"
+
 for result in zip(
-    [results_resp_gpt_4_1, results_resp_gpt_4_1_mini, results_resp_groq_llama_3_3_70b_versatile],
-    ["next_agent_evaluator_gpt_4_1", "next_agent_evaluator_gpt_4_1_mini", "next_agent_evaluator_groq_llama_3_3_70b_versatile"]
+    [results_resp_gpt_4_1, results_resp_gpt_4_1_mini, results_resp_groq_llama_3_3_70b_versatile, results_resp_cascade],
+    ["next_agent_evaluator_gpt_4_1", "next_agent_evaluator_gpt_4_1_mini", "next_agent_evaluator_groq_llama_3_3_70b_versatile", "next_agent_evaluator_cascade"],
+    ["gpt-4.1", "gpt-4.1-mini", "groq/llama-3.3-70b-versatile", "cascade gpt-4.1-mini > gpt-4.1"]
 ):
 
     avg_metric = result[0].feedback_stats[result[1]]["avg"]
     avg_metrics.append(avg_metric)
     error_count += result[0].feedback_stats[result[1]]["errors"]
 
+    usage = usage_report(result[0].name)
+    usage_message += (
+        f"{result[2]:>30} | {avg_metric:>8.3f} | {usage['mean_latency_ms']:>8.0f} | {usage['tokens']:>8} | "
+        f"{usage['cost_usd']:>9.4f} | {usage['escalation_rate']:>9.0%}\n"
+    )
+
     if avg_metric >= ACC_THRESHOLD:
         output_message += f"✅ {result[1]} - Success: {avg_metric}\n"
     else:
         output_message += f"❌ {result[1]} - Failure: {avg_metric}\n"
 
+print(usage_message, flush = True)
+
 if error_count > 0:
     raise AssertionError(f"There were {error_count} errors while running evaluations.")
 elif all(metric >= ACC_THRESHOLD for metric in avg_metrics):
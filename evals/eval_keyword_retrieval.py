@@ -0,0 +1,86 @@
+import argparse
+import statistics
+import time
+
+from langsmith import Client
+from qdrant_client.models import FusionQuery
+
+from api.core.config import config
+from api.core.qdrant import get_qdrant_client
+from api.rag import tools
+
+
+def load_examples(dataset_name):
+    ls_client = Client(api_key=config.LANGSMITH_API_KEY)
+    return [
+        (example.inputs["question"], example.outputs["contexts"])
+        for example in ls_client.list_examples(dataset_name=dataset_name)
+    ]
+
+
+def recall(retrieved_texts, reference_texts):
+    """Share of the reference contexts that were retrieved, compared on their text."""
+    retrieved = {text.strip() for text in retrieved_texts}
+    return sum(text.strip() in retrieved for text in reference_texts) / len(reference_texts)
+
+
+def keyword_only(query, top_k):
+    response = get_qdrant_client().query_points(
+        collection_name=config.QDRANT_COLLECTION_NAME_ITEMS,
+        prefetch=[tools.keyword_prefetch(query, limit=top_k)],
+        query=FusionQuery(fusion="rrf"),
+        limit=top_k,
+    )
+    return [point.payload["text"] for point in response.points]
+
+
+def hybrid(query, top_k):
+    return tools.retrieve_item_context(query, top_k=top_k)["retrieved_context"]
+
+
+def evaluate(examples, retrieve, top_k):
+    recalls = []
+    latencies = []
+    for question, reference_texts in examples:
+        start = time.perf_counter()
+        retrieved_texts = retrieve(question, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(recall(retrieved_texts, reference_texts))
+
+    latencies.sort()
+    return statistics.mean(recalls), statistics.median(latencies), latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of the full-text filter vs the BM25 sparse vector as the keyword leg of item retrieval.")
+    parser.add_argument("--dataset", default="rag-evaluation-dataset")
+    parser.add_argument("--text-filter-collection", default=config.QDRANT_COLLECTION_NAME_ITEMS)
+    parser.add_argument("--bm25-collection", required=True, help="Collection with the BM25 sparse vector, see ingestion.sparse_vectors")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    examples = [(question, contexts) for question, contexts in load_examples(args.dataset) if contexts]
+
+    # Embed every question once up front, so the latencies below are the Qdrant round-trips only.
+    for question, _ in examples:
+        tools.get_embedding(question)
+
+    modes = [
+        ("text_filter", args.text_filter_collection),
+        ("bm25", args.bm25_collection),
+    ]
+
+    print(f"{len(examples)} questions from {args.dataset}, recall@{args.top_k}\n")
+    print(f"{'keyword leg':>12} | {'search':>12} | {'recall':>7} | {'p50 ms':>8} | {'p95 ms':>8}")
+
+    for mode, collection_name in modes:
+        config.KEYWORD_RETRIEVAL_MODE = mode
+        config.QDRANT_COLLECTION_NAME_ITEMS = collection_name
+
+        for search, retrieve in [("keyword only", keyword_only), ("hybrid", hybrid)]:
+            mean_recall, p50, p95 = evaluate(examples, retrieve, args.top_k)
+            print(f"{mode:>12} | {search:>12} | {mean_recall:>7.3f} | {p50:>8.2f} | {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+
+SEED_EXAMPLES_PATH = Path(__file__).parent / "datasets" / "intent_examples.jsonl"
+
+
+def load_jsonl(path) -> list[tuple[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["query"], row["next_agent"]) for row in rows]
+
+
+def eval_dataset_examples() -> list[tuple[str, str]]:
+    from evals.datasets.coordinator_agent import coordinator_eval_dataset
+
+    return [
+        (item["inputs"]["messages"][-1]["content"], item["outputs"]["next_agent"])
+        for item in coordinator_eval_dataset
+    ]
+
+
+def user_text(message) -> str | None:
+    """Content of a logged user message, as a plain dict or a serialized LangChain message."""
+    if not isinstance(message, dict):
+        return None
+    if message.get("role") == "user" or message.get("type") == "human":
+        return message.get("content")
+    kwargs = message.get("kwargs", {})
+    if "HumanMessage" in message.get("id", []):
+        return kwargs.get("content")
+    return None
+
+
+def langsmith_traffic(project_name, limit) -> list[tuple[str, str]]:
+    """First coordinator hops of logged traffic, labelled with the route the LLM coordinator took.
+
+    Hops routed by the classifier itself are skipped, so it is not trained on its own output.
+    """
+    from langsmith import Client
+
+    ls_client = Client(api_key=os.environ["LANGSMITH_API_KEY"])
+    examples = []
+
+    for run in ls_client.list_runs(project_name=project_name, filter='eq(name, "coordinator_agent")', error=False, limit=limit):
+        metadata = (run.extra or {}).get("metadata", {})
+        state = (run.inputs or {}).get("state") or {}
+        if not run.outputs or state.get("coordinator_iteration", 0) != 0:
+            continue
+        if metadata.get("intent_classifier", {}).get("next_agent"):
+            continue
+
+        queries = [text for text in map(user_text, state.get("messages", [])) if text]
+        if queries:
+            examples.append((queries[-1], run.outputs["next_agent"]))
+
+    return examples
+
+
+def report(classifier, examples, min_confidence) -> dict:
+    """Accuracy of every prediction, and share and accuracy of the hops the fast path would take."""
+    correct = 0
+    routed = 0
+    routed_correct = 0
+    latencies = []
+
+    for query, expected in examples:
+        start = time.perf_counter()
+        label, _ = classifier.classify(query, min_confidence)
+        latencies.append((time.perf_counter() - start) * 1_000_000)
+
+        predicted = max(classifier.predict_proba(query).items(), key=lambda item: item[1])[0]
+        correct += predicted == expected
+
+        # A confident direct answer still goes to the LLM, only delegations take the fast path.
+        if label:
+            routed += 1
+            routed_correct += label == expected
+
+    latencies.sort()
+    return {
+        "examples": len(examples),
+        "accuracy": correct / len(examples),
+        "fast_path_share": routed / len(examples),
+        "fast_path_accuracy": routed_correct / routed if routed else None,
+        "p50_us": statistics.median(latencies),
+        "p95_us": latencies[max(int(len(latencies) * 0.95) - 1, 0)],
+    }
+
+
+def print_report(title, result):
+    fast_path_accuracy = "n/a" if result["fast_path_accuracy"] is None else f"{result['fast_path_accuracy']:.3f}"
+    print(
+        f"{title}: {result['examples']} examples, accuracy {result['accuracy']:.3f}, "
+        f"fast path on {result['fast_path_share']:.0%} with accuracy {fast_path_accuracy}, "
+        f"p50 {result['p50_us']:.0f} us, p95 {result['p95_us']:.0f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the coordinator intent classifier and report it against the coordinator eval dataset.")
+    parser.add_argument("--output", default="src/api/rag/classifiers/coordinator_intent.json")
+    parser.add_argument("--traffic", nargs="*", default=[], help="JSONL files of logged turns with query and next_agent")
+    parser.add_argument("--langsmith-project", default=None, help="Also label first coordinator hops logged to this LangSmith project")
+    parser.add_argument("--langsmith-limit", type=int, default=5000)
+    parser.add_argument("--min-confidence", type=float, default=0.85)
+    parser.add_argument("--epochs", type=int, default=200)
+    args = parser.parse_args()
+
+    from api.rag.utils.intent_classifier import IntentClassifier
+
+    examples = load_jsonl(SEED_EXAMPLES_PATH)
+    for path in args.traffic:
+        examples += load_jsonl(path)
+    if args.langsmith_project:
+        examples += langsmith_traffic(args.langsmith_project, args.langsmith_limit)
+    eval_examples = eval_dataset_examples()
+
+    # Held out: the eval dataset is not part of training, so its numbers say how the classifier generalises.
+    held_out = IntentClassifier.train(*zip(*examples), epochs=args.epochs)
+    print_report("Held out coordinator eval dataset", report(held_out, eval_examples, args.min_confidence))
+    print_report("Training examples", report(held_out, examples, args.min_confidence))
+
+    start = time.perf_counter()
+    classifier = IntentClassifier.train(*zip(*(examples + eval_examples)), epochs=args.epochs)
+    training_seconds = time.perf_counter() - start
+
+    classifier.save(args.output)
+    print(f"\nTrained on {len(examples) + len(eval_examples)} examples in {training_seconds:.1f} s, saved to {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
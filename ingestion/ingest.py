@@ -0,0 +1,88 @@
+import argparse
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+def configure_environment(args):
+    if args.qdrant_url:
+        os.environ["QDRANT_URL"] = args.qdrant_url
+    if args.embedder == "stand-in":
+        # The stand-in embedder needs no API access, so the API keys the config requires can be placeholders.
+        for key in ["OPENAI_API_KEY", "GROQ_API_KEY", "LANGSMITH_API_KEY"]:
+            os.environ.setdefault(key, "stand-in")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream an Amazon items or reviews JSONL dump into its Qdrant collection.")
+    parser.add_argument("kind", choices=["items", "reviews"])
+    parser.add_argument("path", help="JSONL file, e.g. data/meta_Electronics_2022_2023_with_category_ratings_100_sample_1000.jsonl")
+    parser.add_argument("--collection", default=None, help="Defaults to QDRANT_COLLECTION_NAME_ITEMS or QDRANT_COLLECTION_NAME_REVIEWS")
+    parser.add_argument("--embedder", choices=["openai", "stand-in"], default="openai", help="stand-in runs fully offline with deterministic vectors")
+    parser.add_argument("--qdrant-url", default=None, help="Defaults to QDRANT_URL")
+    parser.add_argument("--qdrant-path", default=None, help="Use an embedded local Qdrant stored at this path instead of a server")
+    parser.add_argument("--profile", default="default", help="Profile from ingestion/profiles.yaml for a new collection")
+    parser.add_argument("--embed-batch-size", type=int, default=512)
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Embedding batches in flight")
+    parser.add_argument("--upload-batch-size", type=int, default=256)
+    parser.add_argument("--parallel", type=int, default=2, help="Upload processes")
+    parser.add_argument("--checkpoint", default=None, help="Defaults to ingestion_checkpoints/<collection>.json")
+    parser.add_argument("--checkpoint-every", type=int, default=50_000, help="Rows per upload segment, the checkpoint is saved after each one")
+    parser.add_argument("--keep-removed", action="store_true", help="Do not delete points of records that are not in the input, e.g. when ingesting a partial dump")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    configure_environment(args)
+
+    from qdrant_client import QdrantClient
+    from api.core.config import config
+    from api.core.qdrant import get_qdrant_client
+    from api.core.sparse_encoder import BM25SparseEncoder
+    from ingestion.pipeline import ingest, has_sparse_vector, openai_embed_texts, stand_in_embed_texts
+
+    client = QdrantClient(path=args.qdrant_path) if args.qdrant_path else get_qdrant_client()
+    collection_name = args.collection or (config.QDRANT_COLLECTION_NAME_ITEMS if args.kind == "items" else config.QDRANT_COLLECTION_NAME_REVIEWS)
+
+    # New item collections are created with the sparse vector. Existing ones only get it
+    # written if they have it, Qdrant cannot add a named vector to a collection.
+    sparse_encoder = None
+    if args.kind == "items":
+        if not client.collection_exists(collection_name) or has_sparse_vector(client, collection_name, config.QDRANT_SPARSE_VECTOR_NAME):
+            sparse_encoder = BM25SparseEncoder()
+        else:
+            logger.warning(
+                f"Collection {collection_name} has no {config.QDRANT_SPARSE_VECTOR_NAME} sparse vector, ingesting dense vectors only. "
+                f"Copy it with ingestion.sparse_vectors to add BM25 keyword retrieval."
+            )
+
+    stats = ingest(
+        client,
+        args.kind,
+        args.path,
+        collection_name,
+        embed_fn=stand_in_embed_texts if args.embedder == "stand-in" else openai_embed_texts,
+        model=config.EMBEDDING_MODEL or "text-embedding-3-small",
+        sparse_encoder=sparse_encoder,
+        sparse_vector_name=config.QDRANT_SPARSE_VECTOR_NAME,
+        profile=args.profile,
+        embed_batch_size=args.embed_batch_size,
+        max_concurrency=args.max_concurrency,
+        upload_batch_size=args.upload_batch_size,
+        parallel=1 if args.qdrant_path else args.parallel,
+        checkpoint_path=args.checkpoint or os.path.join("ingestion_checkpoints", f"{collection_name}.json"),
+        checkpoint_every=args.checkpoint_every,
+        delete_removed=not args.keep_removed,
+    )
+
+    print(
+        f"Ingested {stats['points']} of {stats['rows']} rows into {collection_name} "
+        f"({stats['unchanged']} unchanged, {stats['payload_updated']} payload updated, {stats['sparse_updated']} sparse vectors updated, {stats['skipped']} skipped, {stats['deleted']} removed points deleted) "
+        f"in {stats['seconds']:.1f} s, {stats['points_per_second']:.0f} points/s, "
+        f"{stats['embedding_tokens']} embedding tokens, max RSS {stats['max_rss_mb']:.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+import hashlib
+import json
+import logging
+import os
+import resource
+import time
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+
+import numpy as np
+from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue, FilterSelector, SetPayloadOperation, SetPayload, PointVectors
+
+from ingestion.provision import create_collection
+
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 1536
+MAX_EMBEDDING_TOKENS = 8192
+
+POINT_ID_NAMESPACE = uuid.UUID("5b0c2a4e-8f61-4c1e-9a57-3d2f7e6b1c90")
+
+
+### Records ###
+
+def read_jsonl(path, start=0):
+    """Yield the rows of a JSONL file one at a time, so the file is never loaded as a whole.
+
+    The first `start` rows are skipped without being parsed.
+    """
+    with open(path, encoding="utf-8") as f:
+        rows = (line for line in f if line.strip())
+        for line in islice(rows, start, None):
+            yield json.loads(line)
+
+
+def point_id(*key) -> str:
+    """Stable point ID derived from the natural key of a record, so re-ingesting a record updates its point in place."""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, ":".join(str(part) for part in key)))
+
+
+def content_hash(text, model) -> str:
+    """Hash of what the vector is built from, changes when the embedded text or the embedding model changes."""
+    return hashlib.sha256(json.dumps([text, model]).encode("utf-8")).hexdigest()
+
+
+def sparse_params_hash(sparse_encoder) -> str:
+    """Hash of the BM25 parameters a sparse vector is built with, changes when the corpus average document length changes."""
+    params = [sparse_encoder.k1, sparse_encoder.b, sparse_encoder.avg_doc_length]
+    return hashlib.sha256(json.dumps(params).encode("utf-8")).hexdigest()
+
+
+def item_record(row):
+    """Embedding text and payload of an item row of the Amazon metadata dump."""
+    text = f"{row['title']} {' '.join(row.get('features') or [])}".strip()
+    images = row.get("images") or [{}]
+
+    return {
+        "id": point_id("item", row["parent_asin"]),
+        "text": text,
+        "payload": {
+            "text": text,
+            "first_large_image": images[0].get("large", ""),
+            "average_rating": row.get("average_rating"),
+            "rating_number": row.get("rating_number"),
+            "price": row.get("price"),
+            "parent_asin": row["parent_asin"],
+        }
+    }
+
+
+def review_record(row):
+    """Embedding text and payload of a review row of the Amazon reviews dump.
+
+    The dump has no review ID, so a review is identified by its author and timestamp
+    unless the row carries a `review_id`.
+    """
+    text = f"{row.get('title', '')} {row.get('text', '')}".strip()
+    review_id = row.get("review_id") or f"{row.get('user_id')}:{row.get('timestamp')}"
+
+    return {
+        "id": point_id("review", row["parent_asin"], review_id),
+        "text": text,
+        "payload": {
+            "text": text,
+            "parent_asin": row["parent_asin"],
+        }
+    }
+
+
+class TokenCounter:
+    """Counts tokens with the embedding model's tokenizer, or estimates four characters per token when it is not available offline."""
+
+    def __init__(self, encoding="cl100k_base"):
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding)
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer {encoding}, estimating tokens from characters: {e}")
+            self._encoding = None
+
+    def __call__(self, text):
+        if self._encoding is None:
+            return (len(text) + 3) // 4
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def read_records(path, to_record, count_tokens, stats, start=0):
+    """Stream records from `path`, skipping empty texts and texts over the embedding model's input limit."""
+    for row in read_jsonl(path, start):
+        stats["rows"] += 1
+        record = to_record(row)
+        if not record["text"] or count_tokens(record["text"]) >= MAX_EMBEDDING_TOKENS:
+            stats["skipped"] += 1
+            continue
+        yield record
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def segments(iterable, size):
+    """Split an iterable into lazy chunks of `size`, each has to be consumed before the next one is taken."""
+    iterator = iter(iterable)
+    for first in iterator:
+        yield chain([first], islice(iterator, size - 1))
+
+
+### Embeddings ###
+
+def openai_embed_texts(texts, model):
+    import openai
+
+    response = openai.embeddings.create(input=texts, model=model)
+    return [item.embedding for item in response.data], response.usage.total_tokens
+
+
+def stand_in_embed_texts(texts, model, dim=EMBEDDING_DIM):
+    """Deterministic unit vectors seeded by the text, for running ingestion without an embeddings API."""
+    embeddings = []
+    for text in texts:
+        vector = np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(dim)
+        embeddings.append((vector / np.linalg.norm(vector)).tolist())
+    return embeddings, sum(len(text.split()) for text in texts)
+
+
+def embed_batches(batches, embed_fn, model, max_concurrency):
+    """Embed batches of records on `max_concurrency` threads and yield (batch, embeddings) in input order.
+
+    At most `max_concurrency` batches are in flight, and the next batch is only read
+    from `batches` when the oldest one is done, so memory does not grow with the input.
+    """
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ingestion-embed") as executor:
+        for batch in batches:
+            if len(in_flight) >= max_concurrency:
+                done_batch, future = in_flight.popleft()
+                yield done_batch, future.result()
+            in_flight.append((batch, executor.submit(embed_fn, [record["text"] for record in batch], model)))
+
+        while in_flight:
+            batch, future = in_flight.popleft()
+            yield batch, future.result()
+
+
+### Incremental runs ###
+
+def load_checkpoint(checkpoint_path, path, collection_name) -> dict:
+    """The checkpoint of an interrupted run over the same file and collection, or a new run."""
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("path") == str(path) and checkpoint.get("collection") == collection_name:
+            logger.info(f"Resuming run {checkpoint['run_id']} after {checkpoint['rows_done']} rows")
+            return checkpoint
+
+    return {"path": str(path), "collection": collection_name, "run_id": uuid.uuid4().hex, "rows_done": 0}
+
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    if not checkpoint_path:
+        return
+
+    # Write and rename, so an interruption while saving cannot leave a truncated checkpoint behind.
+    os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def changed_records(client, collection_name, records, run_id, batch_size, stats, sparse_encoder=None, sparse_vector_name="bm25"):
+    """Yield the records whose point is missing or has a different content hash.
+
+    Points whose embedded text did not change keep their dense vector. Their payload is
+    updated with `set_payload` when another field changed, e.g. the price, and they are
+    stamped with the current `ingestion_run`, so the sweep at the end of the run knows
+    they are still in the input. When the BM25 parameters changed with the corpus, their
+    sparse vector is encoded again, which needs no embeddings call.
+    """
+    for batch in batched(records, batch_size):
+        existing = {
+            str(point.id): point.payload
+            for point in client.retrieve(collection_name, ids=[record["id"] for record in batch], with_payload=True)
+        }
+
+        unchanged = []
+        payload_changed = []
+        for record in batch:
+            stored = existing.get(record["id"])
+            if stored is None or stored.get("content_hash") != record["payload"]["content_hash"]:
+                yield record
+            elif {**stored, "ingestion_run": run_id} == record["payload"]:
+                unchanged.append(record["id"])
+            else:
+                payload_changed.append(record)
+
+        if unchanged:
+            client.set_payload(collection_name, payload={"ingestion_run": run_id}, points=unchanged, wait=True)
+            stats["unchanged"] += len(unchanged)
+
+        if payload_changed:
+            client.batch_update_points(
+                collection_name,
+                update_operations=[
+                    SetPayloadOperation(set_payload=SetPayload(payload=record["payload"], points=[record["id"]]))
+                    for record in payload_changed
+                ],
+                wait=True,
+            )
+            stats["payload_updated"] += len(payload_changed)
+
+        sparse_changed = [
+            record for record in payload_changed
+            if sparse_encoder is not None and existing[record["id"]].get("sparse_hash") != record["payload"]["sparse_hash"]
+        ]
+        if sparse_changed:
+            client.update_vectors(
+                collection_name,
+                points=[
+                    PointVectors(id=record["id"], vector={sparse_vector_name: sparse_encoder.encode_document(record["text"])})
+                    for record in sparse_changed
+                ],
+                wait=True,
+            )
+            stats["sparse_updated"] += len(sparse_changed)
+
+
+def has_sparse_vector(client, collection_name, vector_name) -> bool:
+    return vector_name in (client.get_collection(collection_name).config.params.sparse_vectors or {})
+
+
+def delete_missing(client, collection_name, run_id) -> int:
+    """Delete the points that were not seen by run `run_id`, i.e. records removed from the input."""
+    not_seen = Filter(must_not=[FieldCondition(key="ingestion_run", match=MatchValue(value=run_id))])
+
+    count = client.count(collection_name, count_filter=not_seen, exact=True).count
+    if count:
+        client.delete(collection_name, points_selector=FilterSelector(filter=not_seen), wait=True)
+
+    return count
+
+
+### Pipeline ###
+
+RECORD_BUILDERS = {
+    "items": item_record,
+    "reviews": review_record,
+}
+
+
+def ingest(
+    client,
+    kind,
+    path,
+    collection_name,
+    embed_fn,
+    model,
+    sparse_encoder=None,
+    sparse_vector_name="bm25",
+    profile="default",
+    embed_batch_size=512,
+    max_concurrency=4,
+    upload_batch_size=256,
+    parallel=1,
+    checkpoint_path=None,
+    checkpoint_every=50_000,
+    delete_removed=True,
+):
+    """Stream a JSONL dump into a Qdrant collection.
+
+    Records are read lazily, embedded `embed_batch_size` at a time on up to
+    `max_concurrency` threads and uploaded by `upload_points` in `upload_batch_size`
+    chunks on `parallel` processes. Only the batches in flight are held in memory.
+
+    Point IDs are derived from the record keys and every payload carries a hash of the
+    embedded text, so records whose text did not change since the last run are not
+    embedded again, only their payload is updated. Item payloads also carry a hash of the
+    BM25 parameters, and sparse vectors are encoded again when the corpus changes them.
+    The input is uploaded in segments of `checkpoint_every` rows and the checkpoint is
+    saved after each one, so an interrupted run resumes after the last full segment.
+    Once the whole input is through, points of records that are no longer in it are
+    deleted.
+
+    Args:
+        client: Qdrant client
+        kind: "items" or "reviews"
+        path: Path of the JSONL dump
+        collection_name: Target collection, created with `profile` if it does not exist
+        embed_fn: `embed_fn(texts, model) -> (embeddings, total_tokens)`
+        model: Embedding model
+        sparse_encoder: BM25SparseEncoder for the sparse vector of item collections, the
+            collection must have `sparse_vector_name`
+        checkpoint_path: JSON file for the checkpoint, no checkpoint is kept if None
+        delete_removed: Delete points of records that are not in the input anymore
+
+    Returns:
+        Ingestion stats.
+    """
+
+    to_record = RECORD_BUILDERS[kind]
+    count_tokens = TokenCounter()
+    checkpoint = load_checkpoint(checkpoint_path, path, collection_name)
+    run_id = checkpoint["run_id"]
+    stats = {"rows": checkpoint["rows_done"], "skipped": 0, "unchanged": 0, "payload_updated": 0, "sparse_updated": 0, "points": 0, "deleted": 0, "embedding_tokens": 0}
+    start = time.perf_counter()
+
+    if not client.collection_exists(collection_name):
+        create_collection(client, collection_name, kind, profile, sparse_vector_name)
+
+    if sparse_encoder is not None and not has_sparse_vector(client, collection_name, sparse_vector_name):
+        raise ValueError(
+            f"Collection {collection_name} has no {sparse_vector_name} sparse vector. Ingest without a sparse encoder, "
+            f"or copy the collection with ingestion.sparse_vectors and ingest into the copy."
+        )
+
+    if sparse_encoder is not None:
+        # BM25 length normalisation needs the corpus average up front, one cheap extra pass over the file.
+        sparse_encoder.fit_avg_doc_length(record["text"] for record in read_records(path, to_record, count_tokens, {"rows": 0, "skipped": 0}))
+
+    sparse_hash = sparse_params_hash(sparse_encoder) if sparse_encoder is not None else None
+
+    def with_content_hash(records):
+        for record in records:
+            record["payload"]["content_hash"] = content_hash(record["text"], model)
+            if sparse_hash is not None:
+                record["payload"]["sparse_hash"] = sparse_hash
+            record["payload"]["ingestion_run"] = run_id
+            yield record
+
+    def points(records):
+        records = changed_records(
+            client, collection_name, with_content_hash(records), run_id, embed_batch_size, stats, sparse_encoder, sparse_vector_name
+        )
+        for batch, (embeddings, total_tokens) in embed_batches(batched(records, embed_batch_size), embed_fn, model, max_concurrency):
+            stats["embedding_tokens"] += total_tokens
+            for record, embedding in zip(batch, embeddings):
+                vector = embedding
+                if sparse_encoder is not None:
+                    vector = {"": embedding, sparse_vector_name: sparse_encoder.encode_document(record["text"])}
+
+                stats["points"] += 1
+                yield PointStruct(id=record["id"], vector=vector, payload=record["payload"])
+
+    records = read_records(path, to_record, count_tokens, stats, start=checkpoint["rows_done"])
+    for segment in segments(records, checkpoint_every):
+        client.upload_points(collection_name, points=points(segment), batch_size=upload_batch_size, parallel=parallel, wait=True)
+        checkpoint["rows_done"] = stats["rows"]
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    if delete_removed:
+        stats["deleted"] = delete_missing(client, collection_name, run_id)
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["points_per_second"] = stats["points"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    return stats
@@ -0,0 +1,164 @@
+import argparse
+import os
+from pathlib import Path
+
+import yaml
+from qdrant_client.models import (
+    VectorParams, VectorParamsDiff, Distance, HnswConfigDiff, PayloadSchemaType,
+    SparseVectorParams, Modifier, ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig, Disabled
+)
+
+
+PROFILES_PATH = Path(__file__).parent / "profiles.yaml"
+
+
+def load_profiles(path=PROFILES_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def get_profile(profiles, profile_name) -> dict:
+    if profile_name not in profiles["profiles"]:
+        raise ValueError(f"Unknown profile {profile_name}, available: {', '.join(profiles['profiles'])}")
+    return profiles["profiles"][profile_name]
+
+
+def quantization_config(profile):
+    quantization = profile.get("quantization")
+    if not quantization:
+        return None
+
+    if quantization["type"] == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8,
+            quantile=quantization.get("quantile"),
+            always_ram=quantization.get("always_ram"),
+        ))
+    if quantization["type"] == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=quantization.get("always_ram")))
+
+    raise ValueError(f"Unsupported quantization type {quantization['type']}")
+
+
+def hnsw_config(profile) -> HnswConfigDiff:
+    return HnswConfigDiff(m=profile["hnsw"]["m"], ef_construct=profile["hnsw"]["ef_construct"])
+
+
+def payload_schema(field_type):
+    return PayloadSchemaType(field_type)
+
+
+def create_collection(client, collection_name, kind, profile_name, sparse_vector_name="bm25", profiles=None):
+    """Create an items or reviews collection laid out as `profile_name`."""
+    profiles = profiles or load_profiles()
+    profile = get_profile(profiles, profile_name)
+    spec = profiles["collections"][kind]
+
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=VectorParams(
+            size=profiles["vector_size"],
+            distance=Distance(profiles["distance"]),
+            on_disk=profile["on_disk"],
+        ),
+        hnsw_config=hnsw_config(profile),
+        quantization_config=quantization_config(profile),
+        sparse_vectors_config={sparse_vector_name: SparseVectorParams(modifier=Modifier.IDF)} if spec["bm25_sparse_vector"] else None,
+    )
+
+    for field_name, field_type in spec["payload_indexes"].items():
+        client.create_payload_index(collection_name, field_name=field_name, field_schema=payload_schema(field_type))
+
+
+def migrate_collection(client, collection_name, kind, profile_name, sparse_vector_name="bm25", profiles=None) -> list[str]:
+    """Bring an existing collection in line with `profile_name`.
+
+    HNSW, on-disk and quantization settings are updated in place, Qdrant rebuilds the
+    affected segments in the background. Missing payload indexes are created. A missing
+    sparse vector cannot be added to an existing collection, see `ingestion.sparse_vectors`.
+
+    Returns:
+        The changes that were applied.
+    """
+    profiles = profiles or load_profiles()
+    profile = get_profile(profiles, profile_name)
+    spec = profiles["collections"][kind]
+
+    info = client.get_collection(collection_name)
+    vectors = info.config.params.vectors
+    if isinstance(vectors, dict):
+        vectors = vectors[""]
+
+    changes = []
+
+    hnsw = hnsw_config(profile)
+    if (info.config.hnsw_config.m, info.config.hnsw_config.ef_construct) != (hnsw.m, hnsw.ef_construct):
+        client.update_collection(collection_name, hnsw_config=hnsw)
+        changes.append(f"hnsw m={hnsw.m} ef_construct={hnsw.ef_construct}")
+
+    if bool(vectors.on_disk) != profile["on_disk"]:
+        client.update_collection(collection_name, vectors_config={"": VectorParamsDiff(on_disk=profile["on_disk"])})
+        changes.append(f"vectors on_disk={profile['on_disk']}")
+
+    quantization = quantization_config(profile)
+    if info.config.quantization_config != quantization:
+        client.update_collection(collection_name, quantization_config=quantization or Disabled.DISABLED)
+        changes.append(f"quantization {profile['quantization']['type'] if quantization else 'disabled'}")
+
+    for field_name, field_type in spec["payload_indexes"].items():
+        index_info = info.payload_schema.get(field_name)
+        if index_info is None or index_info.data_type != payload_schema(field_type):
+            client.create_payload_index(collection_name, field_name=field_name, field_schema=payload_schema(field_type))
+            changes.append(f"{field_type} index on {field_name}")
+
+    if spec["bm25_sparse_vector"] and sparse_vector_name not in (info.config.params.sparse_vectors or {}):
+        changes.append(f"sparse vector {sparse_vector_name} is missing, copy the collection with ingestion.sparse_vectors")
+
+    return changes
+
+
+def provision_collection(client, collection_name, kind, profile_name, sparse_vector_name="bm25", profiles=None) -> list[str]:
+    """Create the collection if it does not exist, migrate it otherwise."""
+    if not client.collection_exists(collection_name):
+        create_collection(client, collection_name, kind, profile_name, sparse_vector_name, profiles)
+        return [f"created with profile {profile_name}"]
+
+    return migrate_collection(client, collection_name, kind, profile_name, sparse_vector_name, profiles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or migrate the items and reviews collections from a profile in ingestion/profiles.yaml.")
+    parser.add_argument("--profile", default="default")
+    parser.add_argument("--kinds", nargs="+", choices=["items", "reviews"], default=["items", "reviews"])
+    parser.add_argument("--qdrant-url", default=None, help="Defaults to QDRANT_URL")
+    args = parser.parse_args()
+
+    if args.qdrant_url:
+        os.environ["QDRANT_URL"] = args.qdrant_url
+
+    from api.core.config import config
+    from api.core.qdrant import get_qdrant_client
+
+    client = get_qdrant_client()
+    profiles = load_profiles()
+    profile = get_profile(profiles, args.profile)
+
+    collection_names = {
+        "items": config.QDRANT_COLLECTION_NAME_ITEMS,
+        "reviews": config.QDRANT_COLLECTION_NAME_REVIEWS,
+    }
+
+    for kind in args.kinds:
+        changes = provision_collection(client, collection_names[kind], kind, args.profile, config.QDRANT_SPARSE_VECTOR_NAME, profiles)
+        print(f"{collection_names[kind]}: {'; '.join(changes) or 'already matches profile ' + args.profile}")
+
+    search = profile["search"]
+    print(
+        f"\nQuery settings for profile {args.profile}: QDRANT_SEARCH_HNSW_EF={search['hnsw_ef']} "
+        f"QDRANT_QUANTIZATION_RESCORE={str(search['rescore']).lower()} QDRANT_QUANTIZATION_OVERSAMPLING={search['oversampling']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import time
+
+from qdrant_client.models import PointStruct, SparseVectorParams, Modifier, TextIndexParams
+
+
+def scroll_points(client, collection_name, batch_size, with_vectors):
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=with_vectors,
+        )
+        yield from points
+        if offset is None:
+            break
+
+
+def dense_vectors(vector) -> dict:
+    """Dense vectors of a scrolled point keyed by name, the unnamed default vector under ``."""
+    if isinstance(vector, dict):
+        return {name: value for name, value in vector.items() if isinstance(value, list)}
+    return {"": vector}
+
+
+def create_target_collection(client, source, target, sparse_vector_name):
+    """Create `target` with the dense vectors and payload indexes of `source` plus a BM25 sparse vector."""
+    source_info = client.get_collection(source)
+
+    client.create_collection(
+        collection_name=target,
+        vectors_config=source_info.config.params.vectors,
+        sparse_vectors_config={sparse_vector_name: SparseVectorParams(modifier=Modifier.IDF)},
+    )
+
+    for field_name, index_info in source_info.payload_schema.items():
+        field_schema = index_info.params if isinstance(index_info.params, TextIndexParams) else index_info.data_type
+        client.create_payload_index(target, field_name=field_name, field_schema=field_schema)
+
+
+def copy_with_sparse_vectors(client, encoder, source, target, sparse_vector_name, batch_size, parallel):
+    """Copy every point of `source` into `target` with its BM25 document vector added."""
+
+    def points():
+        for point in scroll_points(client, source, batch_size, with_vectors=True):
+            vector = dense_vectors(point.vector)
+            vector[sparse_vector_name] = encoder.encode_document(point.payload.get("text", ""))
+            yield PointStruct(id=point.id, vector=vector, payload=point.payload)
+
+    client.upload_points(target, points=points(), batch_size=batch_size, parallel=parallel, wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Copy an items collection into a new collection that has a BM25 sparse vector. "
+                    "Qdrant cannot add a named vector to an existing collection, so point "
+                    "QDRANT_COLLECTION_NAME_ITEMS at the target once the copy is done."
+    )
+    parser.add_argument("--source", default=None, help="Defaults to QDRANT_COLLECTION_NAME_ITEMS")
+    parser.add_argument("--target", required=True)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--parallel", type=int, default=1)
+    parser.add_argument("--recreate", action="store_true", help="Drop the target collection first if it exists")
+    args = parser.parse_args()
+
+    from api.core.config import config
+    from api.core.qdrant import get_qdrant_client
+    from api.core.sparse_encoder import BM25SparseEncoder
+
+    client = get_qdrant_client()
+    source = args.source or config.QDRANT_COLLECTION_NAME_ITEMS
+
+    if client.collection_exists(args.target):
+        if not args.recreate:
+            raise SystemExit(f"Collection {args.target} already exists, pass --recreate to replace it")
+        client.delete_collection(args.target)
+
+    start = time.perf_counter()
+
+    # BM25 length normalisation needs the average document length of the whole collection up front.
+    encoder = BM25SparseEncoder()
+    avg_doc_length = encoder.fit_avg_doc_length(
+        point.payload.get("text", "") for point in scroll_points(client, source, args.batch_size, with_vectors=False)
+    )
+
+    create_target_collection(client, source, args.target, config.QDRANT_SPARSE_VECTOR_NAME)
+    copy_with_sparse_vectors(client, encoder, source, args.target, config.QDRANT_SPARSE_VECTOR_NAME, args.batch_size, args.parallel)
+
+    print(
+        f"Copied {client.count(args.target).count} points from {source} to {args.target} "
+        f"(average document length {avg_doc_length:.1f} tokens) in {time.perf_counter() - start:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response, HTTPException
 import logging
 
-from api.rag.graph import run_agent_wrapper
+from api.rag.graph import run_agent_wrapper, mcp_tool_catalog
+from api.rag.utils.mcp_pool import mcp_session_pool
+from api.rag.utils.prompt_registry import prompt_registry
+from api.rag.utils.model_router import model_router
+from api.rag.utils.intent_classifier import intent_classifier
+from api.rag.tools import embedding_cache, embedding_batcher, item_context_formatter, review_context_formatter
+from api.rag.catalog import product_cache, aget_products
+from api.rag.cart import cart_version
+from api.rag.tools import add_to_shopping_cart, get_shopping_cart, remove_from_cart
+from api.core.postgres import postgres_pool_stats
 from api.processors.submit_feedback import submit_feedback
 
-from api.api.models import RAGRequest, RAGResponse, RAGUsedImage, FeedbackRequest, FeedbackResponse, ShoppingCartItem
+from api.api.models import RAGRequest, RAGResponse, RAGUsedImage, FeedbackRequest, FeedbackResponse, ShoppingCartItem, CatalogCacheInvalidationRequest, CatalogCacheInvalidationResponse, CartItemsRequest, CartResponse
 
 
 logger = logging.getLogger(__name__)
 
 rag_router = APIRouter()
 feedback_router = APIRouter()
+metrics_router = APIRouter()
+catalog_router = APIRouter()
+cart_router = APIRouter()
 
 
 @rag_router.post("/rag")
@@ -19,7 +31,7 @@ async def rag(
     payload: RAGRequest
 ) -> RAGResponse:
 
-    result = await run_agent_wrapper(payload.query, payload.thread_id)
+    result = await run_agent_wrapper(payload.query, payload.thread_id, payload.cart_version)
 
     used_image_urls = [
         RAGUsedImage(
@@ -32,6 +44,7 @@ async def rag(
 
     shopping_cart = [
         ShoppingCartItem(
+            product_id=item["product_id"],
             price=item["price"],
             quantity=item["quantity"],
             currency=item["currency"],
@@ -39,14 +52,15 @@ async def rag(
             total_price=item["total_price"]
         )
         for item in result["shopping_cart"]
-    ]
+    ] if result["shopping_cart"] is not None else None
 
     return RAGResponse(
         request_id=request.state.request_id,
         answer=result["answer"],
         used_image_urls=used_image_urls,
         trace_id=result["trace_id"],
-        shopping_cart=shopping_cart
+        shopping_cart=shopping_cart,
+        cart_version=result["cart_version"]
     )
 
 
@@ -64,6 +78,119 @@ async def send_feedback(
     )
 
 
+@metrics_router.get("/metrics")
+async def metrics() -> dict:
+
+    return {
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "embedding_batcher": embedding_batcher.stats() if embedding_batcher is not None else None,
+        "product_cache": product_cache.stats() if product_cache is not None else None,
+        "postgres_pool": postgres_pool_stats(),
+        "mcp_tool_catalog": mcp_tool_catalog.stats(),
+        "mcp_session_pool": mcp_session_pool.stats(),
+        "prompt_registry": prompt_registry.stats(),
+        "model_router": model_router.stats(),
+        "intent_classifier": intent_classifier.stats() if intent_classifier else None,
+        "context_formatter": {
+            "items": item_context_formatter.stats(),
+            "reviews": review_context_formatter.stats()
+        }
+    }
+
+
+@catalog_router.post("/catalog/cache/invalidate")
+async def invalidate_catalog_cache(
+    request: Request,
+    payload: CatalogCacheInvalidationRequest
+) -> CatalogCacheInvalidationResponse:
+
+    if product_cache is None:
+        return CatalogCacheInvalidationResponse(request_id=request.state.request_id, catalog_version="")
+
+    if payload.catalog_version is not None:
+        product_cache.set_catalog_version(payload.catalog_version)
+    else:
+        product_cache.invalidate(payload.asins)
+
+    return CatalogCacheInvalidationResponse(
+        request_id=request.state.request_id,
+        catalog_version=product_cache.catalog_version
+    )
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+async def cart_response(thread_id: str, response: Response) -> CartResponse:
+
+    items = await get_shopping_cart(thread_id, thread_id)
+    version = cart_version(items)
+
+    response.headers["ETag"] = f'"{version}"'
+    response.headers["Cache-Control"] = "no-cache"
+
+    return CartResponse(
+        thread_id=thread_id,
+        version=version,
+        items=[ShoppingCartItem(**item) for item in items]
+    )
+
+
+@cart_router.get("/cart/{thread_id}", response_model=CartResponse)
+async def read_cart(
+    request: Request,
+    response: Response,
+    thread_id: str
+):
+
+    cart = await cart_response(thread_id, response)
+
+    if etag_matches(request.headers.get("if-none-match"), response.headers["ETag"]):
+        return Response(status_code=304, headers={"ETag": response.headers["ETag"], "Cache-Control": "no-cache"})
+
+    return cart
+
+
+@cart_router.post("/cart/{thread_id}/items")
+async def add_cart_items(
+    response: Response,
+    thread_id: str,
+    payload: CartItemsRequest
+) -> CartResponse:
+
+    items = [item.model_dump() for item in payload.items]
+
+    products = await aget_products([item["product_id"] for item in items])
+    unknown_product_ids = list(dict.fromkeys(item["product_id"] for item in items if item["product_id"] not in products))
+    if unknown_product_ids:
+        raise HTTPException(status_code=404, detail=f"Products not found in the catalog: {', '.join(unknown_product_ids)}")
+
+    await add_to_shopping_cart(items, thread_id, thread_id)
+
+    return await cart_response(thread_id, response)
+
+
+@cart_router.delete("/cart/{thread_id}/items/{product_id}")
+async def delete_cart_item(
+    response: Response,
+    thread_id: str,
+    product_id: str
+) -> CartResponse:
+
+    removed = await remove_from_cart(product_id, thread_id, thread_id)
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Product {product_id} is not in the cart")
+
+    return await cart_response(thread_id, response)
+
+
 api_router = APIRouter()
 api_router.include_router(rag_router, tags=["rag"])
-api_router.include_router(feedback_router, tags=["feedback"])
\ No newline at end of file
+api_router.include_router(feedback_router, tags=["feedback"])
+api_router.include_router(metrics_router, tags=["metrics"])
+api_router.include_router(catalog_router, tags=["catalog"])
+api_router.include_router(cart_router, tags=["cart"])
\ No newline at end of file
@@ -5,6 +5,7 @@ from typing import List, Any, Optional, Union
 class RAGRequest(BaseModel):
     query: str = Field(..., description="The query to be used in the RAG pipeline")
     thread_id: str = Field(..., description="The thread ID")
+    cart_version: Optional[str] = Field(default=None, description="The cart version the client already has, the cart is left out of the response if it is still current")
 
 
 class RAGUsedImage(BaseModel):
@@ -14,10 +15,11 @@ class RAGUsedImage(BaseModel):
 
 
 class ShoppingCartItem(BaseModel):
+    product_id: Optional[str] = Field(default=None, description="The product ID (parent ASIN) of the item")
     price: Optional[float] = Field(..., description="The price of the item")
     quantity: int = Field(..., description="The quantity of the item")
     currency: str = Field(..., description="The currency of the item")
-    product_image_url: str = Field(..., description="The URL of the image of the item")
+    product_image_url: Optional[str] = Field(..., description="The URL of the image of the item")
     total_price: Optional[float] = Field(..., description="The total price of the item")
 
 
@@ -26,7 +28,8 @@ class RAGResponse(BaseModel):
     answer: str = Field(..., description="The content of the RAG response")
     used_image_urls: List[RAGUsedImage]
     trace_id: str = Field(..., description="The trace ID")
-    shopping_cart: List[ShoppingCartItem] = Field(..., description="The shopping cart")
+    shopping_cart: Optional[List[ShoppingCartItem]] = Field(..., description="The shopping cart, None if the client's cart version is still current")
+    cart_version: str = Field(..., description="The current cart version")
 
 
 class FeedbackRequest(BaseModel):
@@ -39,4 +42,29 @@ class FeedbackRequest(BaseModel):
 
 class FeedbackResponse(BaseModel):
     request_id: str = Field(..., description="The request ID")
-    status: str = Field(..., description="The status of the feedback submission")
\ No newline at end of file
+    status: str = Field(..., description="The status of the feedback submission")
+
+
+class CatalogCacheInvalidationRequest(BaseModel):
+    asins: Optional[List[str]] = Field(default=None, description="The ASINs to invalidate, all cached products are dropped if omitted")
+    catalog_version: Optional[str] = Field(default=None, description="The new catalog version, drops every cached product if it differs from the current one")
+
+
+class CatalogCacheInvalidationResponse(BaseModel):
+    request_id: str = Field(..., description="The request ID")
+    catalog_version: str = Field(..., description="The catalog version after invalidation")
+
+
+class CartItemRequest(BaseModel):
+    product_id: str = Field(..., description="The product ID (parent ASIN) to add")
+    quantity: int = Field(default=1, gt=0, description="The quantity to add")
+
+
+class CartItemsRequest(BaseModel):
+    items: List[CartItemRequest] = Field(..., min_length=1, description="The items to add to the cart")
+
+
+class CartResponse(BaseModel):
+    thread_id: str = Field(..., description="The thread ID, used as both user and cart ID")
+    version: str = Field(..., description="The cart version, also sent as the ETag header")
+    items: List[ShoppingCartItem] = Field(..., description="The items in the shopping cart")
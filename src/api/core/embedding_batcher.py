@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embedding requests into batched calls.
+
+    Requests are collected for up to `window_ms` milliseconds (or until
+    `max_batch_size` texts are queued), grouped by model, deduplicated and sent
+    as one call to `embed_fn(texts, model) -> (embeddings, total_tokens)`.
+    Each caller gets back its own vector and an estimate of its share of the
+    batch token usage. Works from threads via `embed` and from asyncio via `aembed`.
+    """
+
+    def __init__(self, embed_fn, window_ms: float = 5.0, max_batch_size: int = 256, max_concurrency: int = 4):
+        self.embed_fn = embed_fn
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embedding-batch")
+        self._closed = False
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.batches = 0
+        self.embedded_texts = 0
+
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str, model: str) -> Future:
+        if self._closed:
+            raise RuntimeError("EmbeddingBatcher is closed")
+
+        future = Future()
+        self._queue.put((model, text, future))
+        return future
+
+    def embed(self, text: str, model: str) -> tuple[list[float], int]:
+        return self.submit(text, model).result()
+
+    async def aembed(self, text: str, model: str) -> tuple[list[float], int]:
+        return await asyncio.wrap_future(self.submit(text, model))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            pending = [item]
+            deadline = time.monotonic() + self.window
+
+            while len(pending) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._dispatch(pending)
+                    return
+                pending.append(item)
+
+            self._dispatch(pending)
+
+    def _dispatch(self, pending: list):
+        by_model = {}
+        for model, text, future in pending:
+            by_model.setdefault(model, []).append((text, future))
+
+        for model, requests in by_model.items():
+            self._executor.submit(self._embed_batch, model, requests)
+
+    def _embed_batch(self, model: str, requests: list):
+        texts = list(dict.fromkeys(text for text, _ in requests))
+
+        try:
+            embeddings, total_tokens = self.embed_fn(texts, model)
+        except Exception as e:
+            logger.warning(f"Batched embedding call failed for {len(texts)} texts: {e}")
+            for _, future in requests:
+                future.set_exception(e)
+            return
+
+        total_chars = sum(len(text) for text in texts) or 1
+        results = {
+            text: (embedding, round(total_tokens * len(text) / total_chars))
+            for text, embedding in zip(texts, embeddings)
+        }
+
+        with self._lock:
+            self.requests += len(requests)
+            self.batches += 1
+            self.embedded_texts += len(texts)
+
+        for text, future in requests:
+            future.set_result(results[text])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "embedded_texts": self.embedded_texts,
+                "avg_batch_size": self.embedded_texts / self.batches if self.batches else 0.0,
+            }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from api.core.config import config
+
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_lock = asyncio.Lock()
+
+
+async def open_postgres_pool() -> AsyncConnectionPool:
+    """Open the process-wide Postgres connection pool, or return it if it is already open.
+
+    The pool is shared by the LangGraph checkpointer and the shopping cart repository.
+    Connections use autocommit, dict rows and no prepared statements, which is what
+    the checkpointer expects.
+    """
+    global _pool
+
+    if _pool is not None:
+        return _pool
+
+    async with _lock:
+        if _pool is None:
+            pool = AsyncConnectionPool(
+                conninfo=config.POSTGRES_CONN_STRING,
+                min_size=config.POSTGRES_POOL_MIN_SIZE,
+                max_size=config.POSTGRES_POOL_MAX_SIZE,
+                timeout=config.POSTGRES_POOL_TIMEOUT,
+                max_idle=config.POSTGRES_POOL_MAX_IDLE,
+                max_lifetime=config.POSTGRES_POOL_MAX_LIFETIME,
+                check=AsyncConnectionPool.check_connection if config.POSTGRES_POOL_CHECK_CONNECTION else None,
+                kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                name="api",
+                open=False,
+            )
+            await pool.open()
+            _pool = pool
+            logger.info(f"Postgres pool opened (min_size: {pool.min_size}, max_size: {pool.max_size})")
+
+    return _pool
+
+
+async def close_postgres_pool():
+    global _pool
+
+    async with _lock:
+        pool, _pool = _pool, None
+
+    if pool is not None:
+        await pool.close()
+
+
+def postgres_pool_stats() -> dict | None:
+    if _pool is None:
+        return None
+    return _pool.get_stats()
+
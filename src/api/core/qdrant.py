@@ -0,0 +1,97 @@
+import logging
+import threading
+
+import httpx
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.models import SearchParams, QuantizationSearchParams
+
+from api.core.config import config
+
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_async_client = None
+_lock = threading.Lock()
+
+
+def qdrant_client_kwargs() -> dict:
+    """Connection settings shared by the sync and async clients."""
+    kwargs = {
+        "url": config.QDRANT_URL,
+        "timeout": config.QDRANT_TIMEOUT,
+    }
+
+    if config.QDRANT_PREFER_GRPC:
+        # One gRPC channel multiplexes every call, QDRANT_POOL_SIZE only sizes the REST pool.
+        # qdrant-client hands unknown arguments such as pool_size to httpx, which rejects them.
+        kwargs.update(
+            prefer_grpc=True,
+            grpc_port=config.QDRANT_GRPC_PORT,
+            grpc_options={
+                "grpc.keepalive_time_ms": int(config.QDRANT_KEEPALIVE_EXPIRY * 1000),
+                "grpc.keepalive_permit_without_calls": 1,
+            },
+        )
+    else:
+        kwargs["limits"] = httpx.Limits(
+            max_connections=config.QDRANT_POOL_SIZE,
+            max_keepalive_connections=config.QDRANT_POOL_SIZE,
+            keepalive_expiry=config.QDRANT_KEEPALIVE_EXPIRY,
+        )
+
+    return kwargs
+
+
+def dense_search_params() -> SearchParams:
+    """Query-time HNSW and quantization settings for dense searches.
+
+    `QDRANT_SEARCH_HNSW_EF=0` keeps the collection default. The quantization settings
+    only take effect on quantized collections: candidates are oversampled on the
+    quantized vectors and rescored with the original ones.
+    """
+    return SearchParams(
+        hnsw_ef=config.QDRANT_SEARCH_HNSW_EF or None,
+        quantization=QuantizationSearchParams(
+            rescore=config.QDRANT_QUANTIZATION_RESCORE,
+            oversampling=config.QDRANT_QUANTIZATION_OVERSAMPLING,
+        ),
+    )
+
+
+def get_qdrant_client() -> QdrantClient:
+    """Process-wide QdrantClient, created on first use and reused by every caller."""
+    global _client
+
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = QdrantClient(**qdrant_client_kwargs())
+                logger.info(f"Qdrant client created for {config.QDRANT_URL} (grpc: {config.QDRANT_PREFER_GRPC})")
+
+    return _client
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Process-wide AsyncQdrantClient for code running on the event loop."""
+    global _async_client
+
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = AsyncQdrantClient(**qdrant_client_kwargs())
+
+    return _async_client
+
+
+async def close_qdrant_clients():
+    global _client, _async_client
+
+    with _lock:
+        client, async_client = _client, _async_client
+        _client, _async_client = None, None
+
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.close()
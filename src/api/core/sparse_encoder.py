@@ -0,0 +1,69 @@
+import re
+import unicodedata
+import zlib
+from collections import Counter
+
+from qdrant_client.models import SparseVector
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+him his how i if in into is it its itself just me more most my no nor not now of off on once only or other our
+out over own same she should so some such than that the their them then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you your
+""".split())
+
+
+class BM25SparseEncoder:
+    """Local BM25 encoder for a Qdrant sparse vector with the IDF modifier.
+
+    Documents get the BM25 term-frequency part of the score, `tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))`.
+    Queries get weight 1 for each distinct term. Qdrant applies the IDF part at query
+    time from its own collection statistics (`Modifier.IDF`), so nothing has to be
+    refit when documents are added. Terms are hashed to indices with CRC32, so no
+    vocabulary has to be stored or shipped.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: float = 100.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        text = unicodedata.normalize("NFKC", text).lower()
+        return [token for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+    @staticmethod
+    def token_index(token: str) -> int:
+        return zlib.crc32(token.encode("utf-8"))
+
+    def encode_document(self, text: str) -> SparseVector:
+        tokens = self.tokenize(text)
+        length_norm = 1 - self.b + self.b * len(tokens) / self.avg_doc_length
+
+        weights = {}
+        for token, tf in Counter(tokens).items():
+            index = self.token_index(token)
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+
+        return SparseVector(indices=list(weights), values=list(weights.values()))
+
+    def encode_documents(self, texts: list[str]) -> list[SparseVector]:
+        return [self.encode_document(text) for text in texts]
+
+    def encode_query(self, text: str) -> SparseVector:
+        indices = list(dict.fromkeys(self.token_index(token) for token in self.tokenize(text)))
+        return SparseVector(indices=indices, values=[1.0] * len(indices))
+
+    def fit_avg_doc_length(self, texts) -> float:
+        """Set `avg_doc_length` from a corpus, used before encoding the documents of a collection."""
+        total = count = 0
+        for text in texts:
+            total += len(self.tokenize(text))
+            count += 1
+        self.avg_doc_length = total / count if count else self.avg_doc_length
+        return self.avg_doc_length
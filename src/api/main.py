@@ -8,6 +8,12 @@ from contextlib import asynccontextmanager
 from api.core.config import settings
 from api.api.middleware import RequestIDMiddleware
 from api.api.endpoints import api_router
+from api.rag.tools import embedding_cache, embedding_batcher
+from api.core.qdrant import close_qdrant_clients
+from api.core.postgres import close_postgres_pool
+from api.rag.graph import get_graph, reset_graph, mcp_tool_catalog
+from api.rag.utils.mcp_pool import mcp_session_pool
+from api.rag.utils.prompt_registry import prompt_registry
 
 
 logging.basicConfig(
@@ -22,11 +28,24 @@ client = AsyncClient(timeout=settings.DEFAULT_TIMEOUT)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Application starting up...")
+    await get_graph()
+    await mcp_tool_catalog.start()
+    await prompt_registry.start()
 
     yield
 
     logger.info("Application shutting down...")
     await client.aclose()
+    await mcp_tool_catalog.stop()
+    await prompt_registry.stop()
+    await mcp_session_pool.close()
+    await close_qdrant_clients()
+    reset_graph()
+    await close_postgres_pool()
+    if embedding_batcher is not None:
+        embedding_batcher.close()
+    if embedding_cache is not None:
+        embedding_cache.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -1,17 +1,19 @@
 from pydantic import BaseModel, Field
 from typing import List
 import instructor
-from litellm import completion
+from litellm import acompletion
 from openai import OpenAI
 from langsmith import traceable, get_current_run_tree
 from langchain_core.messages import AIMessage
 
 from api.rag.utils.utils import lc_messages_to_regular_messages, format_ai_message
-from api.rag.utils.utils import prompt_template_config
+from api.rag.utils.prompt_registry import prompt_registry
+from api.rag.utils.model_router import model_router
+from api.rag.utils.intent_classifier import intent_classifier
 from api.core.config import config
 
 
-client = instructor.from_litellm(completion)
+client = instructor.from_litellm(acompletion)
 
 
 class MCPToolCall(BaseModel):
@@ -46,6 +48,28 @@ class CoordinatorAgentResponse(BaseModel):
     plan: list[Delegation]
     final_answer: bool = Field(default=False)
     answer: str
+    confidence: float | None = Field(default=None, ge=0, le=1, description="How sure you are, from 0 to 1, that next_agent and final_answer are right.")
+
+
+COORDINATOR_AGENTS = {"", "product_qa_agent", "shopping_cart_agent"}
+
+
+def coordinator_escalation_reason(response: CoordinatorAgentResponse, min_confidence: float) -> str | None:
+    """Why a cascade answer of the coordinator should go to the larger model, None if it can be used.
+
+    The answer has to name a known agent, follow the rule that exactly one of next_agent
+    and final_answer is set, and be at least `min_confidence` sure of itself. An answer
+    without a confidence is escalated.
+    """
+    if response.next_agent not in COORDINATOR_AGENTS:
+        return f"unknown agent {response.next_agent}"
+    if (response.next_agent == "") != response.final_answer:
+        return "next_agent and final_answer disagree"
+    if response.confidence is None:
+        return "no confidence"
+    if response.confidence < min_confidence:
+        return f"confidence {response.confidence:.2f}"
+    return None
 
 
 class ShoppingCartAgentResponse(BaseModel):
@@ -61,16 +85,7 @@ class ShoppingCartAgentResponse(BaseModel):
     run_type="llm",
     metadata={"ls_provider": config.GENERATION_MODEL_PROVIDER, "ls_model_name": config.GENERATION_MODEL}
 )
-def product_qa_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versatile"]):
-
-    prompts = {}
-
-    for model in models:
-        prompt_template = prompt_template_config(config.PRODUCT_QA_AGENT_PROMPT_TEMPLATE_PATH, model)
-        prompt = prompt_template.render(
-            available_tools=state.product_qa_available_tools
-        )
-        prompts[model] = prompt
+async def product_qa_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versatile"]):
 
     messages = state.messages
 
@@ -79,18 +94,20 @@ def product_qa_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versat
     for msg in messages:
         conversation.append(lc_messages_to_regular_messages(msg))
 
-    for model in models:
-        try:
-            response, raw_response = client.chat.completions.create_with_completion(
-                model=model,
-                response_model=ProductQAAgentResponse,
-                messages=[{"role": "system", "content": prompts[model]}, *conversation],
-                temperature=0,
-            )
-            break
-        except Exception as e:
-            print(f"Error with model {model}: {e}")
-            continue
+    async def call_model(model):
+        prompt = prompt_registry.render(
+            config.PRODUCT_QA_AGENT_PROMPT_TEMPLATE_PATH,
+            model,
+            available_tools=state.product_qa_available_tools
+        )
+        return await client.chat.completions.create_with_completion(
+            model=model,
+            response_model=ProductQAAgentResponse,
+            messages=[{"role": "system", "content": prompt}, *conversation],
+            temperature=0,
+        )
+
+    model, (response, raw_response) = await model_router.call(models, call_model)
 
     current_run = get_current_run_tree()
     if current_run:
@@ -99,6 +116,7 @@ def product_qa_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versat
             "output_tokens": raw_response.usage.completion_tokens,
             "total_tokens": raw_response.usage.total_tokens,
         }
+        current_run.metadata["model"] = model
 
     ai_message = format_ai_message(response)
 
@@ -113,19 +131,52 @@ def product_qa_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versat
 
 ### Coordinator Agent ###
 
+def route_with_intent_classifier(conversation) -> dict | None:
+    """Delegate the first hop of a turn without an LLM call when the local classifier is confident.
+
+    Only delegations are taken, a direct answer still needs the LLM to write it.
+    Returns the coordinator state update, or None to fall through to the LLM.
+    """
+    user_messages = [msg["content"] for msg in conversation if msg and msg.get("role") == "user"]
+    if not user_messages:
+        return None
+
+    next_agent, confidence = intent_classifier.classify(user_messages[-1], config.INTENT_CLASSIFIER_MIN_CONFIDENCE)
+
+    trace_id = ""
+    current_run = get_current_run_tree()
+    if current_run:
+        current_run.metadata["intent_classifier"] = {"next_agent": next_agent, "confidence": confidence}
+        trace_id = str(getattr(current_run, "trace_id", current_run.id))
+
+    if not next_agent:
+        return None
+
+    return {
+        "messages": [],
+        "answer": "",
+        "next_agent": next_agent,
+        "plan": [Delegation(agent=next_agent, task=user_messages[-1])],
+        "coordinator_final_answer": False,
+        "trace_id": trace_id
+    }
+
+
 @traceable(
     name="coordinator_agent",
     run_type="llm",
     metadata={"ls_provider": config.GENERATION_MODEL_PROVIDER, "ls_model_name": config.GENERATION_MODEL}
 )
-def coordinator_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versatile"]) -> dict:
+async def coordinator_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versatile"], cascade_models = None) -> dict:
+    """Plan the next step of the conversation.
 
-    prompts = {}
+    With `cascade_models` (by default COORDINATOR_CASCADE_MODELS when the cascade is
+    enabled) the smaller models answer first, and `models` are only called when that
+    answer fails validation or is not confident enough.
+    """
 
-    for model in models:
-        prompt_template = prompt_template_config(config.COORDINATOR_AGENT_PROMPT_TEMPLATE_PATH, model)
-        prompt = prompt_template.render()
-        prompts[model] = prompt
+    if cascade_models is None:
+        cascade_models = config.COORDINATOR_CASCADE_MODELS if config.COORDINATOR_CASCADE_ENABLED else []
 
     messages = state.messages
 
@@ -134,26 +185,53 @@ def coordinator_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versa
     for msg in messages:
         conversation.append(lc_messages_to_regular_messages(msg))
 
-    for model in models:
+    if intent_classifier is not None and state.coordinator_iteration == 0:
+        fast_path = route_with_intent_classifier(conversation)
+        if fast_path is not None:
+            return {**fast_path, "coordinator_iteration": state.coordinator_iteration + 1}
+
+    async def call_model(model):
+        prompt = prompt_registry.render(config.COORDINATOR_AGENT_PROMPT_TEMPLATE_PATH, model)
+        return await client.chat.completions.create_with_completion(
+            model=model,
+            response_model=CoordinatorAgentResponse,
+            messages=[{"role": "system", "content": prompt}, *conversation],
+            temperature=0,
+        )
+
+    model_usage = {}
+
+    def record_usage(model, raw_response):
+        usage = model_usage.setdefault(model, {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0})
+        usage["input_tokens"] += raw_response.usage.prompt_tokens
+        usage["output_tokens"] += raw_response.usage.completion_tokens
+        usage["total_tokens"] += raw_response.usage.total_tokens
+
+    escalation_reason = None
+    if cascade_models:
         try:
-            response, raw_response = client.chat.completions.create_with_completion(
-                model=model,
-                response_model=CoordinatorAgentResponse,
-                messages=[{"role": "system", "content": prompts[model]}, *conversation],
-                temperature=0,
-            )
-            break
+            model, (response, raw_response) = await model_router.call(cascade_models, call_model)
+            record_usage(model, raw_response)
+            escalation_reason = coordinator_escalation_reason(response, config.COORDINATOR_CASCADE_MIN_CONFIDENCE)
         except Exception as e:
-            print(f"Error with model {model}: {e}")
-            continue
+            # Includes answers that never passed the response model validation.
+            escalation_reason = f"error {type(e).__name__}"
 
+    if not cascade_models or escalation_reason:
+        model, (response, raw_response) = await model_router.call(models, call_model)
+        record_usage(model, raw_response)
+
+    trace_id = ""
     current_run = get_current_run_tree()
     if current_run:
         current_run.metadata["usage_metadata"] = {
-            "input_tokens": raw_response.usage.prompt_tokens,
-            "output_tokens": raw_response.usage.completion_tokens,
-            "total_tokens": raw_response.usage.total_tokens,
+            key: sum(usage[key] for usage in model_usage.values())
+            for key in ["input_tokens", "output_tokens", "total_tokens"]
         }
+        current_run.metadata["model"] = model
+        current_run.metadata["model_usage"] = model_usage
+        if cascade_models:
+            current_run.metadata["cascade"] = {"escalated": escalation_reason is not None, "reason": escalation_reason}
         trace_id = str(getattr(current_run, "trace_id", current_run.id))
 
     if response.final_answer:
@@ -181,18 +259,7 @@ def coordinator_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versa
     run_type="llm",
     metadata={"ls_provider": "openai", "ls_model_name": "gpt-4.1"}
 )
-def shopping_cart_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versatile"]) -> dict:
-
-    prompts = {}
-
-    for model in models:
-        prompt_template = prompt_template_config(config.SHOPPING_CART_AGENT_PROMPT_TEMPLATE_PATH, model)
-        prompt = prompt_template.render(
-            available_tools=state.shopping_cart_available_tools,
-            user_id=state.user_id,
-            cart_id=state.cart_id
-        )
-        prompts[model] = prompt
+async def shopping_cart_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-versatile"]) -> dict:
 
     messages = state.messages
 
@@ -201,18 +268,22 @@ def shopping_cart_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-ver
     for msg in messages:
         conversation.append(lc_messages_to_regular_messages(msg))
 
-    for model in models:
-        try:
-            response, raw_response = client.chat.completions.create_with_completion(
-                model=model,
-                response_model=ShoppingCartAgentResponse,
-                messages=[{"role": "system", "content": prompts[model]}, *conversation],
-                temperature=0,
-            )
-            break
-        except Exception as e:
-            print(f"Error with model {model}: {e}")
-            continue
+    async def call_model(model):
+        prompt = prompt_registry.render(
+            config.SHOPPING_CART_AGENT_PROMPT_TEMPLATE_PATH,
+            model,
+            available_tools=state.shopping_cart_available_tools,
+            user_id=state.user_id,
+            cart_id=state.cart_id
+        )
+        return await client.chat.completions.create_with_completion(
+            model=model,
+            response_model=ShoppingCartAgentResponse,
+            messages=[{"role": "system", "content": prompt}, *conversation],
+            temperature=0,
+        )
+
+    model, (response, raw_response) = await model_router.call(models, call_model)
 
     current_run = get_current_run_tree()
     if current_run:
@@ -221,6 +292,7 @@ def shopping_cart_agent_node(state, models = ["gpt-4.1", "groq/llama-3.3-70b-ver
             "output_tokens": raw_response.usage.completion_tokens,
             "total_tokens": raw_response.usage.total_tokens,
         }
+        current_run.metadata["model"] = model
 
     ai_message = format_ai_message(response)
 
@@ -0,0 +1,118 @@
+import hashlib
+import json
+from typing import Awaitable, Callable
+
+from psycopg_pool import AsyncConnectionPool
+
+from api.core.postgres import open_postgres_pool
+
+
+class CartRepository:
+    """Shopping cart queries on top of a pooled Postgres connection.
+
+    Every method borrows a connection with `pool.connection()`, which hands it back to
+    the pool when the block exits, also when a query fails. Queries run on the async
+    pool so a slow database never blocks the event loop.
+    """
+
+    def __init__(self, get_pool: Callable[[], Awaitable[AsyncConnectionPool]]):
+        self.get_pool = get_pool
+
+    async def add_items(self, user_id: str, cart_id: str, items: list[dict], products: dict[str, dict]) -> list[dict]:
+        """Upsert items into a cart with a single statement.
+
+        Quantities of products that are already in the cart are added up by Postgres
+        through the `unique_user_cart_product` constraint, so the whole batch is one
+        round-trip and concurrent adds of the same product cannot race. Items whose
+        product is not in `products` are not written.
+
+        Args:
+            user_id: User ID
+            cart_id: Cart identifier
+            items: Items with product_id and quantity keys
+            products: Product payloads (price, first_large_image) keyed by product ID
+
+        Returns:
+            The items that were added, one per product with the quantities merged.
+        """
+
+        # ON CONFLICT cannot update the same row twice in one statement, so repeated products are merged first.
+        quantities = {}
+        for item in items:
+            if item['product_id'] in products:
+                quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+
+        if not quantities:
+            return []
+
+        product_ids = list(quantities)
+        payloads = [products[product_id] for product_id in product_ids]
+
+        query = """
+            INSERT INTO shopping_carts.shopping_cart_items (
+                user_id, shopping_cart_id, product_id,
+                price, quantity, currency, product_image_url
+            )
+            SELECT %s, %s, item.product_id, item.price, item.quantity, %s, item.product_image_url
+            FROM unnest(%s::varchar[], %s::numeric[], %s::integer[], %s::varchar[])
+                AS item(product_id, price, quantity, product_image_url)
+            ON CONFLICT (user_id, shopping_cart_id, product_id) DO UPDATE
+            SET
+                quantity = shopping_cart_items.quantity + EXCLUDED.quantity,
+                price = EXCLUDED.price,
+                currency = EXCLUDED.currency,
+                product_image_url = COALESCE(EXCLUDED.product_image_url, shopping_cart_items.product_image_url)
+        """
+
+        pool = await self.get_pool()
+        async with pool.connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(query, (
+                user_id,
+                cart_id,
+                'USD',
+                product_ids,
+                [payload.get("price") for payload in payloads],
+                [quantities[product_id] for product_id in product_ids],
+                [payload.get("first_large_image") for payload in payloads],
+            ))
+
+        return [{"product_id": product_id, "quantity": quantities[product_id]} for product_id in product_ids]
+
+    async def get_items(self, user_id: str, cart_id: str) -> list[dict]:
+
+        pool = await self.get_pool()
+        async with pool.connection() as conn, conn.cursor() as cursor:
+
+            query = """
+                    SELECT
+                        product_id, price, quantity,
+                        currency, product_image_url,
+                        (price * quantity) as total_price
+                    FROM shopping_carts.shopping_cart_items
+                    WHERE user_id = %s AND shopping_cart_id = %s
+                    ORDER BY added_at DESC
+                """
+            await cursor.execute(query, (user_id, cart_id))
+
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def remove_item(self, user_id: str, cart_id: str, product_id: str) -> bool:
+
+        pool = await self.get_pool()
+        async with pool.connection() as conn, conn.cursor() as cursor:
+
+            query = """
+                    DELETE FROM shopping_carts.shopping_cart_items
+                    WHERE user_id = %s AND shopping_cart_id = %s AND product_id = %s
+                """
+            await cursor.execute(query, (user_id, cart_id, product_id))
+
+            return cursor.rowcount > 0
+
+
+def cart_version(items: list[dict]) -> str:
+    """Content hash of a cart as returned by `CartRepository.get_items`, stable while the cart does not change."""
+    return hashlib.sha256(json.dumps(items, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+cart_repository = CartRepository(open_postgres_pool)
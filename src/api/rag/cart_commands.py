@@ -0,0 +1,178 @@
+import re
+from dataclasses import dataclass, field
+
+from langsmith import traceable, get_current_run_tree
+
+from api.rag.catalog import aget_products
+from api.rag.tools import add_to_shopping_cart, remove_from_cart, get_shopping_cart
+
+
+ASIN_PATTERN = re.compile(r"^B0[0-9A-Z]{8}$", re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r"\bB0[0-9A-Z]{8}\b|\d+|[a-z']+", re.IGNORECASE)
+
+ADD_WORDS = {"add", "put", "place"}
+REMOVE_WORDS = {"remove", "delete", "drop", "take"}
+SHOW_WORDS = {"show", "list", "display", "view", "what", "what's", "whats"}
+CART_WORDS = {"cart", "basket"}
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+QUANTITY_WORDS = {"x", "of", "unit", "units", "piece", "pieces", "copy", "copies", "pcs"}
+
+# Words that can appear around a command without changing it. Anything else makes the
+# request ambiguous and it goes to the agents.
+FILLER_WORDS = {
+    "please", "can", "could", "would", "will", "you", "i", "i'd", "want", "like", "to", "into", "in", "from", "out",
+    "my", "the", "a", "an", "me", "shopping", "item", "items", "product", "products", "with", "id", "ids", "asin",
+    "and", "also", "too", "is", "are", "it", "them", "thanks", "thank", "content", "contents", "now", "currently",
+}
+
+
+@dataclass
+class CartCommand:
+    """An explicit cart request: `add` with quantities per product, `remove` or `show`."""
+
+    action: str
+    items: list[dict] = field(default_factory=list)
+
+
+def parse_quantity(token: str) -> int | None:
+    if token.isdigit():
+        return int(token)
+    return NUMBER_WORDS.get(token)
+
+
+def parse_cart_command(text: str) -> CartCommand | None:
+    """Recognise unambiguous add, remove and show cart requests that name products by ASIN.
+
+    A quantity is a number or number word before an ASIN ("add 2 B09NLTDHQ6", "two units of
+    B09NLTDHQ6") or an `x N` after it. Removing takes the product out of the cart completely,
+    so a remove with a quantity is left to the agents. Returns None for anything that is not
+    clearly one of the three commands.
+    """
+    tokens = TOKEN_PATTERN.findall(text)
+    if not tokens or len(tokens) > 40:
+        return None
+
+    actions = set()
+    items = []
+    pending_quantity = None
+    explicit_quantity = False
+    has_cart = False
+    previous = None
+
+    for token in tokens:
+        word = token.lower()
+
+        if ASIN_PATTERN.match(token):
+            items.append({"product_id": token.upper(), "quantity": pending_quantity or 1})
+            explicit_quantity |= pending_quantity is not None
+            pending_quantity = None
+
+        elif parse_quantity(word) is not None:
+            quantity = parse_quantity(word)
+            if quantity < 1 or quantity > 100 or pending_quantity is not None:
+                return None
+            if previous == "x" and items:
+                # A trailing "x N" sets the quantity of the product right before it.
+                items[-1]["quantity"] = quantity
+                explicit_quantity = True
+            else:
+                pending_quantity = quantity
+
+        elif word in ADD_WORDS:
+            actions.add("add")
+        elif word in REMOVE_WORDS:
+            actions.add("remove")
+        elif word in SHOW_WORDS:
+            actions.add("show")
+        elif word in CART_WORDS:
+            has_cart = True
+        elif word not in FILLER_WORDS and word not in QUANTITY_WORDS:
+            return None
+
+        previous = word
+
+    if pending_quantity is not None or not has_cart or len(actions) != 1:
+        return None
+
+    action = actions.pop()
+
+    if action == "show":
+        return CartCommand("show") if not items else None
+
+    if not items:
+        return None
+
+    if action == "remove":
+        if explicit_quantity:
+            return None
+        product_ids = list(dict.fromkeys(item["product_id"] for item in items))
+        return CartCommand("remove", [{"product_id": product_id} for product_id in product_ids])
+
+    return CartCommand("add", items)
+
+
+def format_price(value) -> str:
+    return f"${float(value):.2f}" if value is not None else "price unknown"
+
+
+def format_cart(cart_items: list[dict]) -> str:
+    if not cart_items:
+        return "Your cart is empty."
+
+    lines = [
+        f"- {item['product_id']}: {item['quantity']} x {format_price(item.get('price'))}"
+        for item in cart_items
+    ]
+    total = sum(float(item["total_price"]) for item in cart_items if item.get("total_price") is not None)
+    return "Your cart contains:\n" + "\n".join(lines) + f"\n\nTotal: {format_price(total)}"
+
+
+@traceable(
+    name="cart_command",
+    run_type="tool"
+)
+async def execute_cart_command(command: CartCommand, user_id: str, cart_id: str) -> dict:
+    """Run a parsed cart command with the cart tools and write the answer from a template.
+
+    Returns:
+        The answer and the trace ID of this run.
+    """
+
+    if command.action == "add":
+        product_ids = list(dict.fromkeys(item["product_id"] for item in command.items))
+        products = await aget_products(product_ids)
+        unknown = [product_id for product_id in product_ids if product_id not in products]
+
+        if unknown:
+            answer = f"I could not find {', '.join(unknown)} in the catalog, so I did not change your cart."
+        else:
+            await add_to_shopping_cart(command.items, user_id, cart_id)
+            added = ", ".join(f"{item['quantity']} x {item['product_id']}" for item in command.items)
+            answer = f"I added {added} to your cart.\n\n{format_cart(await get_shopping_cart(user_id, cart_id))}"
+
+    elif command.action == "remove":
+        removed = []
+        not_in_cart = []
+        for item in command.items:
+            if await remove_from_cart(item["product_id"], user_id, cart_id):
+                removed.append(item["product_id"])
+            else:
+                not_in_cart.append(item["product_id"])
+
+        sentences = []
+        if removed:
+            sentences.append(f"I removed {', '.join(removed)} from your cart.")
+        if not_in_cart:
+            sentences.append(f"{', '.join(not_in_cart)} {'was' if len(not_in_cart) == 1 else 'were'} not in your cart.")
+        answer = " ".join(sentences) + f"\n\n{format_cart(await get_shopping_cart(user_id, cart_id))}"
+
+    else:
+        answer = format_cart(await get_shopping_cart(user_id, cart_id))
+
+    trace_id = ""
+    current_run = get_current_run_tree()
+    if current_run:
+        current_run.metadata["cart_command"] = {"action": command.action, "items": command.items}
+        trace_id = str(getattr(current_run, "trace_id", current_run.id))
+
+    return {"answer": answer, "trace_id": trace_id}
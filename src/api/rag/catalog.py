@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import OrderedDict
+
+from qdrant_client.models import Filter, FieldCondition, MatchAny
+
+from api.core.config import config
+from api.core.qdrant import get_qdrant_client, get_async_qdrant_client
+
+
+PRODUCT_PAYLOAD_FIELDS = ["parent_asin", "price", "first_large_image"]
+
+
+class ProductCache:
+    """Bounded TTL + LRU cache of product payloads keyed by parent ASIN.
+
+    ASINs that were looked up but not found are cached as negative entries with
+    their own (shorter) TTL, so unknown IDs do not hit Qdrant on every request.
+    Changing the catalog version drops every entry.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 300.0, negative_ttl_seconds: float = 60.0, catalog_version: str = ""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.catalog_version = catalog_version
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def lookup(self, asins: list[str]) -> tuple[dict[str, dict], list[str]]:
+        """Split ASINs into cached products and ASINs that still have to be fetched."""
+        found = {}
+        missing = []
+        now = time.monotonic()
+
+        with self._lock:
+            for asin in asins:
+                entry = self._entries.get(asin)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[asin]
+                    self.expirations += 1
+                    entry = None
+
+                if entry is None:
+                    self.misses += 1
+                    missing.append(asin)
+                    continue
+
+                self._entries.move_to_end(asin)
+                if entry[1] is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                    found[asin] = entry[1]
+
+        return found, missing
+
+    def store(self, asins: list[str], products: dict[str, dict]):
+        now = time.monotonic()
+
+        with self._lock:
+            for asin in asins:
+                product = products.get(asin)
+                ttl = self.ttl_seconds if product is not None else self.negative_ttl_seconds
+                self._entries[asin] = (now + ttl, product)
+                self._entries.move_to_end(asin)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, asins: list[str] | None = None):
+        """Drop the given ASINs, or every entry if no ASINs are given."""
+        with self._lock:
+            if asins is None:
+                self._entries.clear()
+                return
+            for asin in asins:
+                self._entries.pop(asin, None)
+
+    def set_catalog_version(self, catalog_version: str):
+        with self._lock:
+            if catalog_version != self.catalog_version:
+                self.catalog_version = catalog_version
+                self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "catalog_version": self.catalog_version,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            }
+
+
+product_cache = ProductCache(
+    max_entries=config.PRODUCT_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.PRODUCT_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=config.PRODUCT_CACHE_NEGATIVE_TTL_SECONDS,
+    catalog_version=config.PRODUCT_CATALOG_VERSION
+) if config.PRODUCT_CACHE_ENABLED else None
+
+
+def products_filter(asins: list[str]) -> Filter:
+    return Filter(
+        must=[
+            FieldCondition(
+                key="parent_asin",
+                match=MatchAny(any=asins)
+            )
+        ]
+    )
+
+
+def lookup_cached_products(asins: list[str]) -> tuple[dict[str, dict], list[str]]:
+    asins = list(dict.fromkeys(asins))
+    if product_cache is None:
+        return {}, asins
+    return product_cache.lookup(asins)
+
+
+def store_fetched_products(products: dict[str, dict], missing: list[str], points) -> dict[str, dict]:
+    fetched = {
+        point.payload["parent_asin"]: point.payload
+        for point in points
+    }
+
+    if product_cache is not None:
+        product_cache.store(missing, fetched)
+
+    return {**products, **fetched}
+
+
+def get_products(asins: list[str]) -> dict[str, dict]:
+
+    """Look up product payloads for a list of ASINs, serving cached ones from `product_cache`.
+
+    ASINs that are not cached are resolved in a single Qdrant round-trip.
+
+    Args:
+        asins: The parent ASINs of the products to look up
+
+    Returns:
+        A dictionary mapping each found ASIN to its payload (parent_asin, price, first_large_image). Unknown ASINs are left out.
+    """
+
+    products, missing = lookup_cached_products(asins)
+    if not missing:
+        return products
+
+    points, _ = get_qdrant_client().scroll(
+        collection_name=config.QDRANT_COLLECTION_NAME_ITEMS,
+        scroll_filter=products_filter(missing),
+        with_payload=PRODUCT_PAYLOAD_FIELDS,
+        with_vectors=False,
+        limit=len(missing)
+    )
+
+    return store_fetched_products(products, missing, points)
+
+
+async def aget_products(asins: list[str]) -> dict[str, dict]:
+
+    """Async variant of `get_products` for code running on the event loop."""
+
+    products, missing = lookup_cached_products(asins)
+    if not missing:
+        return products
+
+    points, _ = await get_async_qdrant_client().scroll(
+        collection_name=config.QDRANT_COLLECTION_NAME_ITEMS,
+        scroll_filter=products_filter(missing),
+        with_payload=PRODUCT_PAYLOAD_FIELDS,
+        with_vectors=False,
+        limit=len(missing)
+    )
+
+    return store_fetched_products(products, missing, points)
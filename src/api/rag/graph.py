@@ -1,20 +1,23 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Annotated, Optional
 from operator import add
+import asyncio
 
 from api.rag.agents import ToolCall, RAGUsedContext, coordinator_agent_node, product_qa_agent_node, MCPToolCall, shopping_cart_agent_node, Delegation
-from api.rag.utils.utils import mcp_tool_node, get_tool_descriptions_from_mcp_servers, get_tool_descriptions_from_node
+from api.rag.utils.utils import mcp_tool_node, get_tool_descriptions_from_node
+from api.rag.utils.mcp_catalog import MCPToolCatalog
+from api.rag.utils.mcp_pool import mcp_session_pool
 from api.rag.tools import add_to_shopping_cart, remove_from_cart, get_shopping_cart
 from api.core.config import config
-
-import numpy as np
-
-from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
+from api.core.postgres import open_postgres_pool
+from api.rag.catalog import aget_products
+from api.rag.cart import cart_version as get_cart_version
+from api.rag.cart_commands import parse_cart_command, execute_cart_command
 
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from langgraph.prebuilt import ToolNode
+from langchain_core.messages import AIMessage
 
 
 class State(BaseModel):
@@ -36,6 +39,8 @@ class State(BaseModel):
     cart_id: str = ""
     plan: list[Delegation] = Field(default_factory=list)
     next_agent: str = ""
+    cart_version: str = ""
+    cart_tools_used: bool = Field(default=False)
 
 
 #### ROUTERS ####
@@ -87,6 +92,18 @@ shopping_cart_agent_tools = [add_to_shopping_cart, remove_from_cart, get_shoppin
 shopping_cart_tool_node = ToolNode(shopping_cart_agent_tools)
 shopping_cart_tool_descriptions = get_tool_descriptions_from_node(shopping_cart_tool_node)
 
+
+async def shopping_cart_tools_node(state):
+    """Run the cart tools and flag the turn, so the cart is read again when the response is built."""
+
+    result = await shopping_cart_tool_node.ainvoke(state)
+
+    return {**result, "cart_tools_used": True}
+
+
+mcp_tool_catalog = MCPToolCatalog(config.MCP_SERVERS, ttl_seconds=config.MCP_TOOL_CATALOG_TTL_SECONDS)
+mcp_session_pool.on_tools_changed = mcp_tool_catalog.invalidate
+
 workflow = StateGraph(State)
 
 workflow.add_edge(START, "coordinator_agent_node")
@@ -95,7 +112,7 @@ workflow.add_node("shopping_cart_agent_node", shopping_cart_agent_node)
 workflow.add_node("coordinator_agent_node", coordinator_agent_node)
 workflow.add_node("product_qa_agent_node", product_qa_agent_node)
 workflow.add_node("product_qa_tool_node", mcp_tool_node)
-workflow.add_node("shopping_cart_tool_node", shopping_cart_tool_node)
+workflow.add_node("shopping_cart_tool_node", shopping_cart_tools_node)
 
 workflow.add_conditional_edges(
     "coordinator_agent_node",
@@ -129,11 +146,72 @@ workflow.add_edge("product_qa_tool_node", "product_qa_agent_node")
 workflow.add_edge("shopping_cart_tool_node", "shopping_cart_agent_node")
 
 
+compiled_graph = None
+compiled_graph_lock = asyncio.Lock()
+
+
+async def get_graph():
+    """Compile the workflow with a pooled Postgres checkpointer once and reuse it for every request."""
+    global compiled_graph
+
+    if compiled_graph is None:
+        async with compiled_graph_lock:
+            if compiled_graph is None:
+                checkpointer = AsyncPostgresSaver(await open_postgres_pool())
+                await checkpointer.setup()
+                compiled_graph = workflow.compile(checkpointer=checkpointer)
+
+    return compiled_graph
+
+
+def reset_graph():
+    global compiled_graph
+    compiled_graph = None
+
+
+async def run_cart_command(command, question: str, thread_id: str):
+    """Answer an explicit cart command without the agents and record the turn in the thread.
+
+    The question and the templated answer are appended to the checkpointed messages as if the
+    coordinator had answered, so later turns that go through the agents still see them.
+    """
+
+    result = await execute_cart_command(command, thread_id, thread_id)
+
+    update = {
+        "messages": [{"role": "user", "content": question}, AIMessage(content=result["answer"])],
+        "answer": result["answer"],
+        "trace_id": result["trace_id"],
+        "user_id": thread_id,
+        "cart_id": thread_id,
+        "next_agent": "",
+        "plan": [],
+        "retrieved_context_ids": [],
+        "coordinator_final_answer": True,
+        "cart_tools_used": True
+    }
+
+    graph = await get_graph()
+    await graph.aupdate_state(
+        {"configurable": {"thread_id": thread_id}},
+        update,
+        as_node="coordinator_agent_node"
+    )
+
+    return update
+
+
 async def run_agent(question: str, thread_id: str):
 
-    mcp_servers = ["http://items_mcp_server:8000/mcp", "http://reviews_mcp_server:8000/mcp"]
+    command = parse_cart_command(question) if config.CART_COMMANDS_ENABLED else None
+    if command is not None:
+        return await run_cart_command(command, question, thread_id)
+
+    missing_servers = mcp_tool_catalog.missing_servers()
+    if missing_servers:
+        await mcp_tool_catalog.refresh(missing_servers)
 
-    product_qa_tool_descriptions = await get_tool_descriptions_from_mcp_servers(mcp_servers)
+    product_qa_tool_descriptions = mcp_tool_catalog.get_tool_descriptions()
 
     initial_state = {
         "messages": [{"role": "user", "content": question}],
@@ -146,63 +224,74 @@ async def run_agent(question: str, thread_id: str):
         "shopping_cart_available_tools": shopping_cart_tool_descriptions,
         "product_qa_final_answer": False,
         "shopping_cart_final_answer": False,
-        "coordinator_final_answer": False
+        "coordinator_final_answer": False,
+        "cart_tools_used": False
     }
 
     configuration = {"configurable": {"thread_id": thread_id}}
 
-    async with AsyncPostgresSaver.from_conn_string(config.POSTGRES_CONN_STRING) as checkpointer:
+    graph = await get_graph()
 
-        graph = workflow.compile(checkpointer=checkpointer)
-
-        result = await graph.ainvoke(initial_state, config=configuration)
+    result = await graph.ainvoke(initial_state, config=configuration)
 
     return result
 
 
-async def run_agent_wrapper(question: str, thread_id: str):
+async def run_agent_wrapper(question: str, thread_id: str, cart_version: str | None = None):
+
+    """Run the agent and collect what the API response needs.
 
-    qdrant_client = QdrantClient(url=config.QDRANT_URL)
+    The cart is only read from Postgres when a cart tool ran in this turn, or when the
+    cart version the client knows differs from the one recorded in the thread's state.
+    Otherwise `shopping_cart` is None and the client keeps the cart it has.
+    """
 
     result = await run_agent(question, thread_id)
 
+    retrieved_context_ids = result.get("retrieved_context_ids", [])
+    products = await aget_products([context.id for context in retrieved_context_ids])
+
     image_url_list = []
-    dummy_vector = np.zeros(1536).tolist()
-    for id in result.get("retrieved_context_ids", []):
-        payload = qdrant_client.query_points(
-            collection_name=config.QDRANT_COLLECTION_NAME_ITEMS,
-            query=dummy_vector,
-            query_filter=Filter(
-                must=[
-                    FieldCondition(
-                        key="parent_asin",
-                        match=MatchValue(value=id.id)
-                    )
-                ]
-            ),
-            with_payload=True,
-            limit=1
-        ).points[0].payload
+    for context in retrieved_context_ids:
+        payload = products.get(context.id, {})
         image_url = payload.get("first_large_image")
         price = payload.get("price")
         if image_url:
-            image_url_list.append({"image_url": image_url, "price": price, "description": id.description})
-
-    shopping_cart = get_shopping_cart(thread_id, thread_id)
-    shopping_cart_items = [
-            {
-                "price": item.get("price"),
-                "quantity": item.get("quantity"),
-                "currency": item.get("currency"),
-                "product_image_url": item.get("product_image_url"),
-                "total_price": item.get("total_price")
-            } 
-        for item in shopping_cart
-    ]
+            image_url_list.append({"image_url": image_url, "price": price, "description": context.description})
+
+    known_cart_version = result.get("cart_version", "")
+    current_cart_version = known_cart_version
+    shopping_cart_items = None
+
+    if result.get("cart_tools_used") or not known_cart_version or cart_version != known_cart_version:
+
+        shopping_cart = await get_shopping_cart(thread_id, thread_id)
+        current_cart_version = get_cart_version(shopping_cart)
+
+        if current_cart_version != known_cart_version:
+            graph = await get_graph()
+            await graph.aupdate_state(
+                {"configurable": {"thread_id": thread_id}},
+                {"cart_version": current_cart_version},
+                as_node="coordinator_agent_node"
+            )
+
+        shopping_cart_items = [
+                {
+                    "product_id": item.get("product_id"),
+                    "price": item.get("price"),
+                    "quantity": item.get("quantity"),
+                    "currency": item.get("currency"),
+                    "product_image_url": item.get("product_image_url"),
+                    "total_price": item.get("total_price")
+                } 
+            for item in shopping_cart
+        ]
 
     return {
         "answer": result.get("answer"),
         "retrieved_images": image_url_list,
         "trace_id": result.get("trace_id"),
-        "shopping_cart": shopping_cart_items
+        "shopping_cart": shopping_cart_items,
+        "cart_version": current_cart_version
     }
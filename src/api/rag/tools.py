@@ -1,41 +1,162 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Prefetch, Filter, FieldCondition, MatchText, FusionQuery, MatchAny, MatchValue
+import logging
+
+from qdrant_client.models import Prefetch, Filter, FieldCondition, MatchText, FusionQuery, MatchAny
 
 import openai
 
 from langsmith import traceable, get_current_run_tree
 
 from openai import OpenAI
-import psycopg2
-import numpy as np
-from psycopg2.extras import RealDictCursor
 
 from api.core.config import config
+from api.core.qdrant import get_qdrant_client, dense_search_params
+from api.rag.catalog import aget_products
+from api.rag.cart import cart_repository
+from api.core.embedding_cache import EmbeddingCache
+from api.core.embedding_batcher import EmbeddingBatcher
+from api.core.sparse_encoder import BM25SparseEncoder
+from api.core.context_formatter import ContextFormatter
 
 
-@traceable(
-    name="embed_query",
-    run_type="embedding",
-    metadata={"ls_provider": config.EMBEDDING_MODEL_PROVIDER, "ls_model_name": config.EMBEDDING_MODEL}
-)
-def get_embedding(text, model=config.EMBEDDING_MODEL):
+logger = logging.getLogger(__name__)
+
+
+def embed_texts(texts, model=config.EMBEDDING_MODEL):
     response = openai.embeddings.create(
-        input=[text],
+        input=texts,
         model=model,
     )
 
+    return [item.embedding for item in response.data], response.usage.total_tokens
+
+
+embedding_cache = EmbeddingCache(
+    path=config.EMBEDDING_CACHE_PATH,
+    max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+    dtype=config.EMBEDDING_CACHE_DTYPE
+) if config.EMBEDDING_CACHE_ENABLED else None
+
+embedding_batcher = EmbeddingBatcher(
+    embed_texts,
+    window_ms=config.EMBEDDING_BATCH_WINDOW_MS,
+    max_batch_size=config.EMBEDDING_BATCH_MAX_SIZE,
+    max_concurrency=config.EMBEDDING_BATCH_MAX_CONCURRENCY
+) if config.EMBEDDING_BATCH_ENABLED else None
+
+sparse_encoder = BM25SparseEncoder()
+
+
+item_context_formatter = ContextFormatter(
+    max_tokens=config.CONTEXT_MAX_TOKENS_ITEMS,
+    max_chunk_tokens=config.CONTEXT_MAX_CHUNK_TOKENS,
+    dedup_threshold=config.CONTEXT_DEDUP_THRESHOLD,
+    encoding=config.CONTEXT_TOKENIZER_ENCODING
+)
+
+review_context_formatter = ContextFormatter(
+    max_tokens=config.CONTEXT_MAX_TOKENS_REVIEWS,
+    max_chunk_tokens=config.CONTEXT_MAX_CHUNK_TOKENS,
+    dedup_threshold=config.CONTEXT_DEDUP_THRESHOLD,
+    encoding=config.CONTEXT_TOKENIZER_ENCODING
+)
+
+
+def set_embedding_usage_metadata(total_tokens):
     current_run = get_current_run_tree()
     if current_run:
         current_run.metadata["usage_metadata"] = {
-            "input_tokens": response.usage.prompt_tokens,
-            "total_tokens": response.usage.total_tokens,
+            "input_tokens": total_tokens,
+            "total_tokens": total_tokens,
         }
 
-    return response.data[0].embedding
+
+
+def set_context_formatting_metadata(stats):
+    current_run = get_current_run_tree()
+    if current_run:
+        current_run.metadata["context_formatting"] = stats
+
+@traceable(
+    name="embed_query",
+    run_type="embedding",
+    metadata={"ls_provider": config.EMBEDDING_MODEL_PROVIDER, "ls_model_name": config.EMBEDDING_MODEL}
+)
+def get_embedding(text, model=config.EMBEDDING_MODEL):
+    if embedding_cache is not None:
+        cached_embedding = embedding_cache.get(model, text)
+        if cached_embedding is not None:
+            return cached_embedding.tolist()
+
+    if embedding_batcher is not None:
+        embedding, total_tokens = embedding_batcher.embed(text, model)
+    else:
+        embeddings, total_tokens = embed_texts([text], model)
+        embedding = embeddings[0]
+
+    set_embedding_usage_metadata(total_tokens)
+
+    if embedding_cache is not None:
+        embedding_cache.put(model, text, embedding)
+
+    return embedding
 
 
 ### Items Tool ###
 
+sparse_vector_checks = {}
+
+
+def sparse_vector_available(collection_name, vector_name) -> bool:
+    """Whether the collection has the sparse vector, looked up once per collection.
+
+    A failed lookup is not remembered, so the next query checks again.
+    """
+    key = (collection_name, vector_name)
+    if key not in sparse_vector_checks:
+        try:
+            collection = get_qdrant_client().get_collection(collection_name)
+        except Exception as e:
+            logger.warning(f"Could not check {collection_name} for the sparse vector {vector_name}: {e}")
+            return False
+
+        sparse_vector_checks[key] = vector_name in (collection.config.params.sparse_vectors or {})
+        if not sparse_vector_checks[key]:
+            logger.warning(
+                f"Collection {collection_name} has no sparse vector {vector_name}, falling back to the full-text filter. "
+                f"Copy it with ingestion.sparse_vectors and point QDRANT_COLLECTION_NAME_ITEMS at the copy."
+            )
+
+    return sparse_vector_checks[key]
+
+
+def keyword_prefetch(query, limit=20):
+    """Keyword leg of the hybrid search.
+
+    By default (`KEYWORD_RETRIEVAL_MODE=text_filter`) this is the unranked full-text
+    filter, which works on every items collection. With `bm25` it is a ranked search on
+    the collection's BM25 sparse vector, as long as the collection has that vector.
+    """
+
+    if config.KEYWORD_RETRIEVAL_MODE == "bm25" and sparse_vector_available(config.QDRANT_COLLECTION_NAME_ITEMS, config.QDRANT_SPARSE_VECTOR_NAME):
+        return Prefetch(
+            query=sparse_encoder.encode_query(query),
+            using=config.QDRANT_SPARSE_VECTOR_NAME,
+            limit=limit
+        )
+
+    return Prefetch(
+        filter=Filter(
+            must=[
+                FieldCondition(
+                    key="text",
+                    match=MatchText(text=query)
+                )
+            ]
+        ),
+        limit=limit
+    )
+
+
 @traceable(
     name="retrieve_top_n",
     run_type="retriever"
@@ -43,26 +164,17 @@ def get_embedding(text, model=config.EMBEDDING_MODEL):
 def retrieve_item_context(query, top_k=5):
     query_embedding = get_embedding(query)
 
-    qdrant_client = QdrantClient(url=config.QDRANT_URL)
+    qdrant_client = get_qdrant_client()
 
     results = qdrant_client.query_points(
         collection_name=config.QDRANT_COLLECTION_NAME_ITEMS,
         prefetch=[
             Prefetch(
                 query=query_embedding,
+                params=dense_search_params(),
                 limit=20
             ),
-            Prefetch(
-                filter=Filter(
-                    must=[
-                        FieldCondition(
-                            key="text",
-                            match=MatchText(text=query)
-                        )
-                    ]
-                ),
-                limit=20
-            )
+            keyword_prefetch(query, limit=20)
         ],
         query=FusionQuery(fusion="rrf"),
         limit=top_k
@@ -90,10 +202,8 @@ def retrieve_item_context(query, top_k=5):
 )
 def process_item_context(context):
 
-    formatted_context = ""
-
-    for id, chunk in zip(context["retrieved_context_ids"], context["retrieved_context"]):
-        formatted_context += f"- {id}: {chunk}\n"
+    formatted_context, stats = item_context_formatter.format_items(context["retrieved_context_ids"], context["retrieved_context"])
+    set_context_formatting_metadata(stats)
 
     return formatted_context
 
@@ -125,13 +235,14 @@ def get_formatted_item_context(query: str, top_k: int = 5) -> str:
 def retrieve_review_context(query, item_list, top_k=20):
     query_embedding = get_embedding(query)
 
-    qdrant_client = QdrantClient(url=config.QDRANT_URL)
+    qdrant_client = get_qdrant_client()
 
     results = qdrant_client.query_points(
         collection_name=config.QDRANT_COLLECTION_NAME_REVIEWS,
         prefetch=[
             Prefetch(
                 query=query_embedding,
+                params=dense_search_params(),
                 filter=Filter(
                     must=[
                         FieldCondition(
@@ -168,10 +279,8 @@ def retrieve_review_context(query, item_list, top_k=20):
 )
 def process_review_context(context):
 
-    formatted_context = ""
-
-    for id, chunk in zip(context["retrieved_context_ids"], context["retrieved_context"]):
-        formatted_context += f"- {id}: {chunk}\n"
+    formatted_context, stats = review_context_formatter.format_grouped(context["retrieved_context_ids"], context["retrieved_context"])
+    set_context_formatting_metadata(stats)
 
     return formatted_context
 
@@ -197,7 +306,7 @@ def get_formatted_review_context(query: str, item_list: list[str], top_k: int =
 
 #### Shopping Cart Agent Tools ####
 
-def add_to_shopping_cart(items: list[dict], user_id: str, cart_id: str) -> str:
+async def add_to_shopping_cart(items: list[dict], user_id: str, cart_id: str) -> str:
 
     """Add a list of provided items to the shopping cart.
     
@@ -207,88 +316,23 @@ def add_to_shopping_cart(items: list[dict], user_id: str, cart_id: str) -> str:
         cart_id: The id of the shopping cart to add the items to.
         
     Returns:
-        A list of the items added to the shopping cart.
+        A list of the items added to the shopping cart, and an error naming the products that were not found.
     """
 
-    conn = psycopg2.connect(
-        host="postgres",
-        port=5432,
-        database="langgraph_db",
-        user="langgraph_user",
-        password="langgraph_password"
-    )
-    conn.autocommit = True
+    products = await aget_products([item['product_id'] for item in items])
 
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        
-        for item in items:
-            product_id = item['product_id']
-            quantity = item['quantity']
+    added_items = await cart_repository.add_items(user_id, cart_id, items, products)
 
-            qdrant_client = QdrantClient(url=config.QDRANT_URL)
+    result = f"Added {added_items} to the shopping cart." if added_items else "No items were added to the shopping cart."
 
-            dummy_vector = np.zeros(1536).tolist()
-            payload = qdrant_client.query_points(
-                collection_name=config.QDRANT_COLLECTION_NAME_ITEMS,
-                query=dummy_vector,
-                query_filter=Filter(
-                    must=[
-                        FieldCondition(
-                            key="parent_asin",
-                            match=MatchValue(value=product_id)
-                        )
-                    ]
-                ),
-                with_payload=True,
-                limit=1
-            ).points[0].payload
+    unknown_product_ids = list(dict.fromkeys(item['product_id'] for item in items if item['product_id'] not in products))
+    if unknown_product_ids:
+        result = f"Error: products {', '.join(unknown_product_ids)} were not found in the catalog and were not added. {result}"
 
-            product_image_url = payload.get("first_large_image")
-            price = payload.get("price")
-            currency = 'USD'
-        
-            # Check if item already exists
-            check_query = """
-                SELECT id, quantity, price 
-                FROM shopping_carts.shopping_cart_items 
-                WHERE user_id = %s AND shopping_cart_id = %s AND product_id = %s
-            """
-            cursor.execute(check_query, (user_id, cart_id, product_id))
-            existing_item = cursor.fetchone()
-            
-            if existing_item:
-                # Update existing item
-                new_quantity = existing_item['quantity'] + quantity
-                
-                update_query = """
-                    UPDATE shopping_carts.shopping_cart_items 
-                    SET 
-                        quantity = %s,
-                        price = %s,
-                        currency = %s,
-                        product_image_url = COALESCE(%s, product_image_url)
-                    WHERE user_id = %s AND shopping_cart_id = %s AND product_id = %s
-                    RETURNING id, quantity, price
-                """
-                
-                cursor.execute(update_query, (new_quantity, price, currency, product_image_url, user_id, cart_id, product_id))
-            
-            else:
-                # Insert new item
-                insert_query = """
-                    INSERT INTO shopping_carts.shopping_cart_items (
-                        user_id, shopping_cart_id, product_id,
-                        price, quantity, currency, product_image_url
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id, quantity, price
-                """
-                
-                cursor.execute(insert_query, (user_id, cart_id, product_id, price, quantity, currency, product_image_url))
-            
-    return f"Added {items} to the shopping cart."
-
-
-def get_shopping_cart(user_id: str, cart_id: str) -> list[dict]:
+    return result
+
+
+async def get_shopping_cart(user_id: str, cart_id: str) -> list[dict]:
 
     """
     Retrieve all items in a user's shopping cart.
@@ -300,33 +344,11 @@ def get_shopping_cart(user_id: str, cart_id: str) -> list[dict]:
     Returns:
         List of dictionaries containing cart items
     """
-    
-    conn = psycopg2.connect(
-        host="postgres",
-        port=5432,
-        database="langgraph_db",
-        user="langgraph_user",
-        password="langgraph_password"
-    )
-    conn.autocommit = True
-
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-
-        query = """
-                SELECT 
-                    product_id, price, quantity,
-                    currency, product_image_url,
-                    (price * quantity) as total_price
-                FROM shopping_carts.shopping_cart_items 
-                WHERE user_id = %s AND shopping_cart_id = %s
-                ORDER BY added_at DESC
-            """
-        cursor.execute(query, (user_id, cart_id))
-
-        return [dict(row) for row in cursor.fetchall()]
+
+    return await cart_repository.get_items(user_id, cart_id)
     
 
-def remove_from_cart(product_id: str, user_id: str, cart_id: str) -> str:
+async def remove_from_cart(product_id: str, user_id: str, cart_id: str) -> str:
 
     """
     Remove an item completely from the shopping cart.
@@ -339,22 +361,5 @@ def remove_from_cart(product_id: str, user_id: str, cart_id: str) -> str:
     Returns:
         True if item was removed, False if item wasn't found
     """
-    
-    conn = psycopg2.connect(
-        host="postgres",
-        port=5432,
-        database="langgraph_db",
-        user="langgraph_user",
-        password="langgraph_password"
-    )
-    conn.autocommit = True
-
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-
-        query = """
-                DELETE FROM shopping_carts.shopping_cart_items
-                WHERE user_id = %s AND shopping_cart_id = %s AND product_id = %s
-            """
-        cursor.execute(query, (user_id, cart_id, product_id))
 
-        return cursor.rowcount > 0
\ No newline at end of file
+    return await cart_repository.remove_item(user_id, cart_id, product_id)
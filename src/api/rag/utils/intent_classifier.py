@@ -0,0 +1,162 @@
+import json
+import logging
+import math
+import random
+import re
+import time
+import zlib
+from pathlib import Path
+
+from api.core.config import config
+
+
+logger = logging.getLogger(__name__)
+
+ASIN_PATTERN = re.compile(r"\bB0[0-9A-Z]{8}\b")
+WORD_PATTERN = re.compile(r"[a-z0-9<>']+")
+
+
+def hashed_features(text: str, dim: int, char_ngrams: tuple[int, ...] = (3, 4)) -> dict[int, float]:
+    """L2 normalised counts of hashed word unigrams, word bigrams and character n-grams.
+
+    ASINs are folded into one `<asin>` token, the product ID matters for routing, not its value.
+    Features are hashed with crc32 so a saved model gives the same features in every process.
+    """
+    words = WORD_PATTERN.findall(ASIN_PATTERN.sub(" <asin> ", text).lower())
+
+    tokens = [f"w:{word}" for word in words]
+    tokens += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        for n in char_ngrams:
+            tokens += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+
+    features = {}
+    for token in tokens:
+        index = zlib.crc32(token.encode("utf-8")) % dim
+        features[index] = features.get(index, 0.0) + 1.0
+
+    norm = math.sqrt(sum(value * value for value in features.values())) or 1.0
+    return {index: value / norm for index, value in features.items()}
+
+
+class IntentClassifier:
+    """Multinomial logistic regression over hashed n-grams of the user query.
+
+    Small enough to train and run in pure Python, a prediction takes a fraction of a millisecond.
+    The weights are stored sparse, only features seen in training have a weight.
+    """
+
+    def __init__(self, labels: list[str], dim: int = 2**18, char_ngrams: tuple[int, ...] = (3, 4), weights: list[dict[int, float]] | None = None, bias: list[float] | None = None, metadata: dict | None = None):
+        self.labels = labels
+        self.dim = dim
+        self.char_ngrams = tuple(char_ngrams)
+        self.weights = weights or [{} for _ in labels]
+        self.bias = bias or [0.0 for _ in labels]
+        self.metadata = metadata or {}
+
+        self.predictions = 0
+        self.confident_predictions = 0
+
+    def features(self, text: str) -> dict[int, float]:
+        return hashed_features(text, self.dim, self.char_ngrams)
+
+    def _probabilities(self, features: dict[int, float]) -> list[float]:
+        scores = [
+            bias + sum(value * weights.get(index, 0.0) for index, value in features.items())
+            for weights, bias in zip(self.weights, self.bias)
+        ]
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return [value / total for value in exps]
+
+    def predict_proba(self, text: str) -> dict[str, float]:
+        return dict(zip(self.labels, self._probabilities(self.features(text))))
+
+    def classify(self, text: str, min_confidence: float = 0.0) -> tuple[str | None, float]:
+        """Most likely label and its probability, the label is None below `min_confidence`."""
+        probabilities = self._probabilities(self.features(text))
+        best = max(range(len(self.labels)), key=probabilities.__getitem__)
+
+        self.predictions += 1
+        if probabilities[best] < min_confidence:
+            return None, probabilities[best]
+
+        self.confident_predictions += 1
+        return self.labels[best], probabilities[best]
+
+    @classmethod
+    def train(cls, texts: list[str], labels: list[str], dim: int = 2**18, char_ngrams: tuple[int, ...] = (3, 4), epochs: int = 200, learning_rate: float = 1.0, l2: float = 1e-4, seed: int = 0) -> "IntentClassifier":
+        """Fit the weights with plain SGD on the cross entropy, with L2 regularisation."""
+        classifier = cls(sorted(set(labels)), dim=dim, char_ngrams=char_ngrams)
+        label_index = {label: i for i, label in enumerate(classifier.labels)}
+        examples = [(classifier.features(text), label_index[label]) for text, label in zip(texts, labels)]
+
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(examples)
+            rate = learning_rate / (1 + epoch / 10)
+            for features, target in examples:
+                probabilities = classifier._probabilities(features)
+                for k, weights in enumerate(classifier.weights):
+                    gradient = probabilities[k] - (1.0 if k == target else 0.0)
+                    classifier.bias[k] -= rate * gradient
+                    for index, value in features.items():
+                        weight = weights.get(index, 0.0)
+                        weights[index] = weight - rate * (gradient * value + l2 * weight)
+
+        classifier.metadata = {"examples": len(texts), "epochs": epochs, "trained_at": time.time()}
+        return classifier
+
+    def to_dict(self) -> dict:
+        return {
+            "labels": self.labels,
+            "dim": self.dim,
+            "char_ngrams": list(self.char_ngrams),
+            "bias": self.bias,
+            "weights": [{str(index): round(weight, 6) for index, weight in weights.items() if abs(weight) > 1e-6} for weights in self.weights],
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IntentClassifier":
+        return cls(
+            labels=data["labels"],
+            dim=data["dim"],
+            char_ngrams=tuple(data["char_ngrams"]),
+            weights=[{int(index): weight for index, weight in weights.items()} for weights in data["weights"]],
+            bias=data["bias"],
+            metadata=data.get("metadata", {}),
+        )
+
+    def save(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def stats(self) -> dict:
+        return {
+            "labels": self.labels,
+            "predictions": self.predictions,
+            "confident_predictions": self.confident_predictions,
+            "trained_on": self.metadata.get("examples"),
+        }
+
+
+def load_intent_classifier() -> IntentClassifier | None:
+    if not config.INTENT_CLASSIFIER_ENABLED:
+        return None
+    try:
+        return IntentClassifier.load(config.INTENT_CLASSIFIER_PATH)
+    except Exception as e:
+        logger.error(f"Could not load the intent classifier from {config.INTENT_CLASSIFIER_PATH}, every turn goes to the LLM coordinator: {e}")
+        return None
+
+
+intent_classifier = load_intent_classifier()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+
+from api.rag.utils.utils import get_tool_descriptions_from_mcp_servers
+
+
+logger = logging.getLogger(__name__)
+
+
+class MCPToolCatalog:
+    """Cached tool descriptions for a list of MCP servers.
+
+    Tools are discovered once at startup and refreshed in the background every
+    `ttl_seconds`, or earlier when `invalidate` is called (e.g. on a
+    `notifications/tools/list_changed` message). If a server cannot be reached
+    the last known tools for that server keep being served.
+    """
+
+    def __init__(self, servers: list[str], ttl_seconds: float = 300.0):
+        self.servers = servers
+        self.ttl_seconds = ttl_seconds
+
+        self._tools_by_server = {}
+        self._refreshed_at = {}
+        self._refresh_requested = asyncio.Event()
+        self._task = None
+
+        self.refreshes = 0
+        self.failures = 0
+
+    async def refresh(self, servers: list[str] | None = None):
+        await asyncio.gather(*(self._refresh_server(server) for server in servers or self.servers))
+
+    async def _refresh_server(self, server: str):
+        try:
+            tools = await get_tool_descriptions_from_mcp_servers([server])
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Could not list tools from {server}, serving last known catalog: {e}")
+            return
+
+        self._tools_by_server[server] = tools
+        self._refreshed_at[server] = time.time()
+        self.refreshes += 1
+
+    def get_tool_descriptions(self) -> list[dict]:
+        """Return the cached tool descriptions of all servers without any network calls."""
+        return [
+            tool
+            for server in self.servers
+            for tool in self._tools_by_server.get(server, [])
+        ]
+
+    def missing_servers(self) -> list[str]:
+        """Servers whose tools have never been listed successfully."""
+        return [server for server in self.servers if server not in self._tools_by_server]
+
+    def invalidate(self):
+        """Ask the background task to refresh the catalog now."""
+        self._refresh_requested.set()
+
+    async def start(self):
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._refresh_requested.wait(), timeout=self.ttl_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_requested.clear()
+            await self.refresh()
+
+    def stats(self) -> dict:
+        return {
+            "servers": {
+                server: {
+                    "tools": len(self._tools_by_server.get(server, [])),
+                    "refreshed_at": self._refreshed_at.get(server),
+                }
+                for server in self.servers
+            },
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
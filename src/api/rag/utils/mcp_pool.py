@@ -0,0 +1,209 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Callable
+
+import mcp.types
+from fastmcp import Client as FastMCPClient
+from fastmcp.client.messages import MessageHandler
+from fastmcp.exceptions import ToolError
+from mcp.shared.exceptions import McpError
+
+from api.core.config import config
+
+
+logger = logging.getLogger(__name__)
+
+
+class ToolListChangedHandler(MessageHandler):
+    """Forwards `notifications/tools/list_changed` from a server to a callback."""
+
+    def __init__(self, on_tools_changed: Callable[[], Any]):
+        self.on_tools_changed = on_tools_changed
+
+    async def on_tool_list_changed(self, message: mcp.types.ToolListChangedNotification) -> None:
+        self.on_tools_changed()
+
+
+class MCPSessionPool:
+    """Long-lived MCP client sessions shared across requests.
+
+    Every server URL gets up to `sessions_per_server` initialized sessions that are
+    handed out round-robin, so the connect + `initialize` handshake is paid once per
+    session instead of once per tool call. At most `max_in_flight` calls run against
+    a server at the same time, and each call is bounded by `call_timeout`.
+
+    A session that fails at the transport level is dropped and the call is retried
+    once on a fresh session. Errors reported by the tool itself are raised as is.
+    Sessions idle for longer than `idle_check_seconds` are pinged before reuse, so a
+    session lost to a server restart is replaced instead of hanging until the timeout.
+    A call that times out only fails itself: other calls may share its session, so the
+    session is kept and pinged on its next checkout instead of being closed.
+    """
+
+    def __init__(
+        self,
+        sessions_per_server: int = 2,
+        max_in_flight: int = 16,
+        call_timeout: float = 30.0,
+        handshake_timeout: float = 10.0,
+        idle_check_seconds: float = 30.0,
+        on_tools_changed: Callable[[], Any] | None = None
+    ):
+        self.sessions_per_server = sessions_per_server
+        self.max_in_flight = max_in_flight
+        self.call_timeout = call_timeout
+        self.handshake_timeout = handshake_timeout
+        self.idle_check_seconds = idle_check_seconds
+        self.on_tools_changed = on_tools_changed
+
+        self._sessions = {}
+        self._counters = {}
+        self._semaphores = {}
+        self._locks = {}
+        self._last_used = {}
+        self._suspect = set()
+
+        self.sessions_created = 0
+        self.session_reuses = 0
+        self.reconnects = 0
+        self.timeouts = 0
+        self.calls = 0
+        self.handshake_seconds_total = 0.0
+
+    def _tools_changed(self):
+        if self.on_tools_changed is not None:
+            self.on_tools_changed()
+
+    def _semaphore(self, server: str) -> asyncio.Semaphore:
+        if server not in self._semaphores:
+            self._semaphores[server] = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphores[server]
+
+    async def _connect(self, server: str) -> FastMCPClient:
+        client = FastMCPClient(
+            server,
+            message_handler=ToolListChangedHandler(self._tools_changed),
+            init_timeout=self.handshake_timeout
+        )
+
+        start = time.perf_counter()
+        await client.__aenter__()
+        self.handshake_seconds_total += time.perf_counter() - start
+        self.sessions_created += 1
+        self._last_used[client] = time.monotonic()
+
+        return client
+
+    async def _is_alive(self, session: FastMCPClient) -> bool:
+        if session not in self._suspect and time.monotonic() - self._last_used.get(session, 0.0) < self.idle_check_seconds:
+            return True
+        try:
+            alive = await asyncio.wait_for(session.ping(), timeout=self.handshake_timeout)
+        except Exception:
+            alive = False
+        if alive:
+            self._suspect.discard(session)
+        return alive
+
+    async def _acquire(self, server: str) -> FastMCPClient:
+        """Return a connected session for `server`, opening a new one while the pool is not full."""
+        sessions = self._sessions.setdefault(server, [])
+        lock = self._locks.setdefault(server, asyncio.Lock())
+
+        async with lock:
+            sessions[:] = [session for session in sessions if session.is_connected()]
+            if len(sessions) < self.sessions_per_server:
+                session = await self._connect(server)
+                sessions.append(session)
+                return session
+
+        self.session_reuses += 1
+        counter = self._counters.setdefault(server, itertools.count())
+        return sessions[next(counter) % len(sessions)]
+
+    async def _discard(self, server: str, session: FastMCPClient):
+        sessions = self._sessions.get(server, [])
+        if session in sessions:
+            sessions.remove(session)
+        self._last_used.pop(session, None)
+        self._suspect.discard(session)
+        try:
+            await session.close()
+        except Exception as e:
+            logger.debug(f"Error while closing MCP session to {server}: {e}")
+
+    async def call_tool(self, server: str, name: str, arguments: dict[str, Any] | None = None):
+        """Call a tool on `server` over a pooled session.
+
+        Args:
+            server: The MCP server URL
+            name: The name of the tool
+            arguments: The tool arguments
+
+        Returns:
+            The fastmcp `CallToolResult` of the call.
+
+        Raises:
+            ToolError: If the tool reported an error.
+            asyncio.TimeoutError: If the call did not finish within `call_timeout`.
+        """
+
+        async with self._semaphore(server):
+            self.calls += 1
+
+            for attempt in range(2):
+                session = await self._acquire(server)
+                if not await self._is_alive(session):
+                    await self._discard(server, session)
+                    self.reconnects += 1
+                    session = await self._acquire(server)
+
+                self._last_used[session] = time.monotonic()
+                try:
+                    return await asyncio.wait_for(session.call_tool(name, arguments), timeout=self.call_timeout)
+                except (ToolError, McpError):
+                    raise
+                except asyncio.TimeoutError:
+                    # The call may already have had side effects, so it is not retried.
+                    self.timeouts += 1
+                    self._suspect.add(session)
+                    raise
+                except Exception as e:
+                    await self._discard(server, session)
+                    if attempt == 1:
+                        raise
+                    self.reconnects += 1
+                    logger.warning(f"MCP session to {server} failed, reconnecting: {e}")
+
+    async def close(self):
+        for server, sessions in list(self._sessions.items()):
+            for session in list(sessions):
+                await self._discard(server, session)
+        self._sessions.clear()
+        self._locks.clear()
+        self._semaphores.clear()
+
+    def stats(self) -> dict:
+        return {
+            "servers": {
+                server: {"sessions": len(sessions)}
+                for server, sessions in self._sessions.items()
+            },
+            "calls": self.calls,
+            "sessions_created": self.sessions_created,
+            "session_reuses": self.session_reuses,
+            "reconnects": self.reconnects,
+            "timeouts": self.timeouts,
+            "avg_handshake_ms": self.handshake_seconds_total / self.sessions_created * 1000 if self.sessions_created else 0.0,
+        }
+
+
+mcp_session_pool = MCPSessionPool(
+    sessions_per_server=config.MCP_SESSIONS_PER_SERVER,
+    max_in_flight=config.MCP_MAX_IN_FLIGHT_PER_SERVER,
+    call_timeout=config.MCP_CALL_TIMEOUT_SECONDS,
+    handshake_timeout=config.MCP_HANDSHAKE_TIMEOUT_SECONDS,
+    idle_check_seconds=config.MCP_SESSION_IDLE_CHECK_SECONDS
+)
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from api.core.config import config
+
+
+logger = logging.getLogger(__name__)
+
+
+class ModelHealth:
+    """Rolling latency and error stats of one model, plus its circuit breaker.
+
+    A call that was cancelled because a hedged call answered first counts as a timeout:
+    a failure whose latency, a lower bound of the real one, is kept in the percentiles.
+    The circuit opens after `failure_threshold` consecutive failures and stays open for
+    `cooldown_seconds`. After that it is half open: calls go through again, the first
+    success closes the circuit and a failure opens it for another cooldown.
+    """
+
+    def __init__(self, window: int, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.circuit_opens = 0
+
+    def allows_call(self) -> bool:
+        return time.monotonic() >= self.opened_until
+
+    def circuit(self) -> str:
+        if self.opened_until == 0.0:
+            return "closed"
+        return "open" if time.monotonic() < self.opened_until else "half_open"
+
+    def record(self, latency_ms: float, ok: bool, timed_out: bool = False):
+        self.calls += 1
+        self.outcomes.append(ok)
+
+        if ok or timed_out:
+            self.latencies.append(latency_ms)
+
+        if ok:
+            self.consecutive_failures = 0
+            self.opened_until = 0.0
+            return
+
+        self.timeouts += timed_out
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            if self.opened_until == 0.0:
+                self.circuit_opens += 1
+            self.opened_until = time.monotonic() + self.cooldown_seconds
+
+    def percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * q), len(latencies) - 1)]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "error_rate": self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "circuit": self.circuit(),
+            "circuit_opens": self.circuit_opens,
+        }
+
+
+class ModelRouter:
+    """Calls the first healthy model of a fallback list and keeps per-model health.
+
+    Models whose circuit is open are skipped, unless every model is open, in which case
+    the list is tried as given. With `hedge_after_ms` set, the next model is started
+    when the current one has not answered within that deadline, and whichever answers
+    first wins; the other call is cancelled and recorded as a timeout. Without hedging a
+    model is only tried after the previous one failed, as before.
+    """
+
+    def __init__(self, window: int = 200, failure_threshold: int = 3, cooldown_seconds: float = 30.0, hedge_after_ms: float = 0.0):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.hedge_after_ms = hedge_after_ms
+
+        self._health = {}
+        self._lock = threading.Lock()
+
+        self.hedged_calls = 0
+        self.hedge_wins = 0
+
+    def health(self, model: str) -> ModelHealth:
+        with self._lock:
+            if model not in self._health:
+                self._health[model] = ModelHealth(self.window, self.failure_threshold, self.cooldown_seconds)
+            return self._health[model]
+
+    def candidates(self, models: list[str]) -> list[str]:
+        available = [model for model in models if self.health(model).allows_call()]
+        return available or list(models)
+
+    async def _timed_call(self, model: str, call: Callable[[str], Awaitable[Any]]):
+        start = time.perf_counter()
+        try:
+            result = await call(model)
+        except asyncio.CancelledError:
+            # Cancelled as the losing hedged call, record it or a slow model would never trip its circuit.
+            self.health(model).record((time.perf_counter() - start) * 1000, ok=False, timed_out=True)
+            raise
+        except Exception as e:
+            self.health(model).record((time.perf_counter() - start) * 1000, ok=False)
+            logger.warning(f"Error with model {model}: {e}")
+            raise
+        self.health(model).record((time.perf_counter() - start) * 1000, ok=True)
+        return result
+
+    async def call(self, models: list[str], call: Callable[[str], Awaitable[Any]]) -> tuple[str, Any]:
+        """Run `call(model)` on the models in fallback order.
+
+        Returns:
+            The model that answered and its result.
+
+        Raises:
+            The error of the last model tried if all of them failed.
+        """
+        candidates = self.candidates(models)
+        if self.hedge_after_ms > 0:
+            return await self._call_hedged(candidates, call)
+
+        last_error = None
+        for model in candidates:
+            try:
+                return model, await self._timed_call(model, call)
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    async def _call_hedged(self, candidates: list[str], call: Callable[[str], Awaitable[Any]]) -> tuple[str, Any]:
+        pending = {}
+        remaining = list(candidates)
+        last_error = None
+        hedged = False
+
+        def launch():
+            model = remaining.pop(0)
+            pending[asyncio.create_task(self._timed_call(model, call))] = model
+
+        launch()
+        try:
+            while pending:
+                # Wait for the deadline only while there is a model left to hedge with.
+                timeout = self.hedge_after_ms / 1000 if remaining else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    self.hedged_calls += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    model = pending.pop(task)
+                    if task.exception() is None:
+                        if hedged and model != candidates[0]:
+                            self.hedge_wins += 1
+                        return model, task.result()
+                    last_error = task.exception()
+
+                if not pending and remaining:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    def stats(self) -> dict:
+        with self._lock:
+            health = dict(self._health)
+        return {
+            "models": {model: model_health.stats() for model, model_health in health.items()},
+            "hedge_after_ms": self.hedge_after_ms,
+            "hedged_calls": self.hedged_calls,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+model_router = ModelRouter(
+    window=config.MODEL_ROUTER_WINDOW,
+    failure_threshold=config.MODEL_CIRCUIT_FAILURE_THRESHOLD,
+    cooldown_seconds=config.MODEL_CIRCUIT_COOLDOWN_SECONDS,
+    hedge_after_ms=config.MODEL_HEDGE_AFTER_MS,
+)
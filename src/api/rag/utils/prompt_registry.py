@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import yaml
+from jinja2 import Template
+
+from api.core.config import config
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_KEY = "*"
+
+
+@dataclass(frozen=True)
+class PromptSnapshot:
+    """Compiled templates of one load, keyed by prompt name and then by model.
+
+    A snapshot is never changed after it is built, a reload builds a new one and swaps it in.
+    """
+
+    templates: dict[str, dict[str, Template]] = field(default_factory=dict)
+    file_versions: dict[str, tuple[int, int]] = field(default_factory=dict)
+    hub_templates: dict[str, Template] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+
+class PromptRegistry:
+    """Prompt templates loaded and compiled once, shared by every agent call.
+
+    Every `*.yaml` file in `prompts_dir` is a prompt named after the file, with one
+    template per model under `prompts`. Prompts listed in `hub_prompts` (prompt name to
+    LangSmith hub identifier) are pulled from the hub in the background and used for every
+    model instead of the file. Files are checked for changes every `reload_check_seconds`
+    and hub prompts are pulled again every `hub_refresh_seconds`. A reload compiles
+    everything into a new snapshot and swaps it in at once, so a render never sees a half
+    loaded set of prompts, and a file that fails to load keeps the last good templates.
+    """
+
+    def __init__(self, prompts_dir: str, hub_prompts: dict[str, str] | None = None, reload_check_seconds: float = 5.0, hub_refresh_seconds: float = 300.0):
+        self.prompts_dir = Path(prompts_dir)
+        self.hub_prompts = hub_prompts or {}
+        self.reload_check_seconds = reload_check_seconds
+        self.hub_refresh_seconds = hub_refresh_seconds
+
+        self._snapshot = PromptSnapshot()
+        self._lock = threading.Lock()
+        self._task = None
+        self._hub_refreshed_at = 0.0
+        self._failed_file_versions = None
+
+        self.reloads = 0
+        self.reload_failures = 0
+        self.hub_failures = 0
+        self.renders = 0
+
+    @staticmethod
+    def prompt_name(prompt: str) -> str:
+        """Accept a prompt name or the path of its YAML file."""
+        return Path(prompt).stem
+
+    def _file_versions(self) -> dict[str, tuple[int, int]]:
+        versions = {}
+        for path in sorted(self.prompts_dir.glob("*.yaml")):
+            stat = path.stat()
+            versions[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        return versions
+
+    def _compile_files(self, file_versions) -> dict[str, dict[str, Template]]:
+        templates = {}
+        for path in file_versions:
+            with open(path, "r") as f:
+                prompt_config = yaml.safe_load(f)
+            templates[self.prompt_name(path)] = {
+                model: Template(content)
+                for model, content in prompt_config["prompts"].items()
+            }
+        return templates
+
+    def load(self, force: bool = False) -> bool:
+        """Reload the prompt files if any of them changed since the last load.
+
+        Returns:
+            True if a new snapshot was swapped in.
+        """
+        with self._lock:
+            file_versions = None
+            try:
+                file_versions = self._file_versions()
+                if not force and file_versions in (self._snapshot.file_versions, self._failed_file_versions):
+                    return False
+                templates = self._compile_files(file_versions)
+            except Exception as e:
+                # Remembered so a broken file is reported once, not on every check until it is fixed.
+                self._failed_file_versions = file_versions
+                self.reload_failures += 1
+                logger.error(f"Could not load prompts from {self.prompts_dir}, keeping the last loaded templates: {e}")
+                return False
+
+            self._snapshot = PromptSnapshot(
+                templates=templates,
+                file_versions=file_versions,
+                hub_templates=self._snapshot.hub_templates,
+                loaded_at=time.time(),
+            )
+            self.reloads += 1
+
+        logger.info(f"Loaded {len(templates)} prompts from {self.prompts_dir}")
+        return True
+
+    def pull_hub_prompts(self):
+        """Pull the hub prompts, keeping the last pulled version of any prompt that fails."""
+        if not self.hub_prompts:
+            return
+
+        from langsmith import Client
+        ls_client = Client()
+
+        hub_templates = {}
+        for name, identifier in self.hub_prompts.items():
+            try:
+                hub_templates[name] = Template(ls_client.pull_prompt(identifier).messages[1].prompt.template)
+            except Exception as e:
+                self.hub_failures += 1
+                logger.warning(f"Could not pull prompt {identifier} from the LangSmith hub: {e}")
+
+        with self._lock:
+            self._snapshot = PromptSnapshot(
+                templates=self._snapshot.templates,
+                file_versions=self._snapshot.file_versions,
+                hub_templates={**self._snapshot.hub_templates, **hub_templates},
+                loaded_at=time.time(),
+            )
+        self._hub_refreshed_at = time.monotonic()
+
+    def get_template(self, prompt: str, model: str) -> Template:
+        name = self.prompt_name(prompt)
+        snapshot = self._snapshot
+
+        if name in snapshot.hub_templates:
+            return snapshot.hub_templates[name]
+
+        if name not in snapshot.templates:
+            raise KeyError(f"Unknown prompt {name}")
+
+        templates = snapshot.templates[name]
+        if model in templates:
+            return templates[model]
+        if DEFAULT_MODEL_KEY in templates:
+            return templates[DEFAULT_MODEL_KEY]
+
+        raise KeyError(f"Prompt {name} has no template for model {model}")
+
+    def render(self, prompt: str, model: str, **kwargs) -> str:
+        """Render the prompt for the model that is about to be called."""
+        self.renders += 1
+        return self.get_template(prompt, model).render(**kwargs)
+
+    async def start(self):
+        if not self._snapshot.templates:
+            self.load()
+        await asyncio.to_thread(self.pull_hub_prompts)
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_check_seconds)
+            await asyncio.to_thread(self.load)
+            if self.hub_prompts and time.monotonic() - self._hub_refreshed_at >= self.hub_refresh_seconds:
+                await asyncio.to_thread(self.pull_hub_prompts)
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "prompts": sorted(snapshot.templates),
+            "hub_prompts": sorted(snapshot.hub_templates),
+            "loaded_at": snapshot.loaded_at,
+            "reloads": self.reloads,
+            "reload_failures": self.reload_failures,
+            "hub_failures": self.hub_failures,
+            "renders": self.renders,
+        }
+
+
+prompt_registry = PromptRegistry(
+    config.PROMPTS_DIR,
+    hub_prompts=config.PROMPT_HUB_PROMPTS,
+    reload_check_seconds=config.PROMPT_RELOAD_CHECK_SECONDS,
+    hub_refresh_seconds=config.PROMPT_HUB_REFRESH_SECONDS,
+)
+prompt_registry.load()
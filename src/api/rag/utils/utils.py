@@ -1,37 +1,16 @@
-import yaml
-from jinja2 import Template
-from langsmith import Client
 from fastmcp import Client as FastMCPClient
 from typing import Dict, Any
 import ast
+import asyncio
 import inspect
 import json
+import logging
 import api.rag.tools as tools
+from api.rag.utils.mcp_pool import mcp_session_pool
+from api.core.config import config
 from langchain_core.messages import AIMessage, ToolMessage
 
-ls_client = Client()
-
-
-def prompt_template_config(yaml_file, prompt_key):
-
-    with open(yaml_file, "r") as f:
-        config = yaml.safe_load(f)
-
-    template_content = config["prompts"][prompt_key]
-
-    template = Template(template_content)
-
-    return template
-
-
-def prompt_template_registry(prompt_name):
-
-    template_content = ls_client.pull_prompt(prompt_name).messages[1].prompt.template
-
-    template = Template(template_content)
-
-    return template
-
+logger = logging.getLogger(__name__)
 
 #### FORMAT AI MESSAGE ####
 
@@ -76,7 +55,7 @@ def parse_function_definition(function_def: str) -> Dict[str, Any]:
     
     # Parse the function using AST
     tree = ast.parse(function_def.strip())
-    if not tree.body or not isinstance(tree.body[0], ast.FunctionDef):
+    if not tree.body or not isinstance(tree.body[0], (ast.FunctionDef, ast.AsyncFunctionDef)):
         return result
         
     func = tree.body[0]
@@ -253,26 +232,36 @@ async def get_tool_descriptions_from_mcp_servers(mcp_servers: list[str]):
 
 #### MCP TOOL NODE ####
 
-async def mcp_tool_node(state) -> str:
-
-    tool_messages = []
+async def call_mcp_tool(tc, tool_call_id: str, semaphore: asyncio.Semaphore) -> ToolMessage:
+
+    async with semaphore:
+        try:
+            result = await mcp_session_pool.call_tool(tc.server, tc.name, tc.arguments)
+        except Exception as e:
+            logger.warning(f"MCP tool call {tc.name} on {tc.server} failed: {e!r}")
+            return ToolMessage(
+                content=f"Error calling tool {tc.name}: {e!r}",
+                tool_call_id=tool_call_id,
+                status="error"
+            )
 
-    for i, tc in enumerate(state.mcp_tool_calls):
+    return ToolMessage(
+        content=result,
+        tool_call_id=tool_call_id
+    )
 
-        client = FastMCPClient(tc.server)
 
-        async with client:
-            # List available resources
-            result = await client.call_tool(tc.name, tc.arguments)
+async def mcp_tool_node(state) -> str:
 
-            tool_message = ToolMessage(
-                content=result,
-                tool_call_id=f"call_{i}"
-            )
+    semaphore = asyncio.Semaphore(config.MCP_TOOL_CALL_CONCURRENCY)
 
-            tool_messages.append(tool_message)
+    # gather keeps the order of the tool calls, so call_{i} always maps to the i-th call.
+    tool_messages = await asyncio.gather(*(
+        call_mcp_tool(tc, f"call_{i}", semaphore)
+        for i, tc in enumerate(state.mcp_tool_calls)
+    ))
 
-    return {"messages": tool_messages}
+    return {"messages": list(tool_messages)}
 
 
 #### MESSAGE TRANSFORMATIONS ####
@@ -78,6 +78,37 @@ def submit_feedback(feedback_type=None, feedback_text=""):
     return status, response
 
 
+def refresh_shopping_cart():
+    """Reload the cart from the API, the cart is only downloaded again if it changed since the last refresh."""
+
+    headers = {}
+    if st.session_state.shopping_cart_etag:
+        headers["If-None-Match"] = st.session_state.shopping_cart_etag
+
+    try:
+        response = requests.get(f"{settings.API_URL}/cart/{session_id}", headers=headers, timeout=10)
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Could not refresh the shopping cart: {e}")
+        return
+
+    if response.status_code == 304:
+        return
+
+    if response.ok:
+        st.session_state.shopping_cart = response.json().get("items", [])
+        st.session_state.shopping_cart_etag = response.headers.get("ETag")
+
+
+def update_shopping_cart(method, path, **kwargs):
+    """Edit the cart through the cart endpoints and keep the returned cart, no agent run involved."""
+
+    status, output = api_call(method, f"{settings.API_URL}/cart/{session_id}{path}", **kwargs)
+    if status:
+        st.session_state.shopping_cart = output.get("items", [])
+        st.session_state.shopping_cart_etag = f'"{output.get("version")}"'
+    return status, output
+
+
 
 # Initialize session state variables
 if "retrieved_items" not in st.session_state:
@@ -86,6 +117,9 @@ if "retrieved_items" not in st.session_state:
 if "shopping_cart" not in st.session_state:
     st.session_state.shopping_cart = []
 
+if "shopping_cart_etag" not in st.session_state:
+    st.session_state.shopping_cart_etag = None
+
 if "messages" not in st.session_state:
     st.session_state.messages = [{"role": "assistant", "content": "Hello! How can I assist you today?"}]
 
@@ -111,6 +145,8 @@ if "feedback_submission_status" not in st.session_state:
 if "trace_id" not in st.session_state:
     st.session_state.trace_id = None
 
+refresh_shopping_cart()
+
 # Sidebar with Tabs
 with st.sidebar:
     # Create tabs in the sidebar
@@ -134,11 +170,21 @@ with st.sidebar:
             
             for idx, item in enumerate(st.session_state.shopping_cart):
                 st.caption(item.get('description', 'No description'))
-                if 'product_image_url' in item:
+                if item.get('product_image_url'):
                     st.image(item["product_image_url"], width=250)
                 st.caption(f"Price: {item['price']} {item['currency']}")
                 st.caption(f"Quantity: {item['quantity']}")
                 st.caption(f"Total price: {item['total_price']} {item['currency']}")
+                if item.get("product_id"):
+                    col_add, col_remove = st.columns(2)
+                    with col_add:
+                        if st.button("Add one", key=f"cart_add_{item['product_id']}"):
+                            update_shopping_cart("post", "/items", json={"items": [{"product_id": item["product_id"], "quantity": 1}]})
+                            st.rerun()
+                    with col_remove:
+                        if st.button("Remove", key=f"cart_remove_{item['product_id']}"):
+                            update_shopping_cart("delete", f"/items/{item['product_id']}")
+                            st.rerun()
                 st.divider()
         else:
             st.info("Your cart is empty")
@@ -233,10 +279,14 @@ if prompt := st.chat_input("Hello! How can I assist you today?"):
         st.markdown(prompt)
     
     with st.spinner("Thinking..."):
-        status, output = api_call("post", f"{settings.API_URL}/rag", json={"query": prompt, "thread_id": session_id})
+        cart_version = st.session_state.shopping_cart_etag.strip('"') if st.session_state.shopping_cart_etag else None
+        status, output = api_call("post", f"{settings.API_URL}/rag", json={"query": prompt, "thread_id": session_id, "cart_version": cart_version})
         # Update retrieved items and shopping cart
         st.session_state.retrieved_items = output.get("used_image_urls", [])
-        st.session_state.shopping_cart = output.get("shopping_cart", [])
+        if output.get("shopping_cart") is not None:
+            st.session_state.shopping_cart = output["shopping_cart"]
+        if output.get("cart_version"):
+            st.session_state.shopping_cart_etag = f'"{output["cart_version"]}"'
         st.session_state.trace_id = output.get("trace_id", None)
         
         response_content = output.get("answer", str(output))
@@ -3,9 +3,31 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Config(BaseSettings):
     OPENAI_API_KEY: str
     QDRANT_URL: str = 'qdrant'
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: int = 10
+    QDRANT_POOL_SIZE: int = 10
+    QDRANT_KEEPALIVE_EXPIRY: float = 30.0
+    QDRANT_SEARCH_HNSW_EF: int = 0
+    QDRANT_QUANTIZATION_RESCORE: bool = True
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 1.0
     QDRANT_COLLECTION_NAME_ITEMS: str = "Amazon-items-collection-02-items"
+    KEYWORD_RETRIEVAL_MODE: str = "text_filter"
+    QDRANT_SPARSE_VECTOR_NAME: str = "bm25"
     EMBEDDING_MODEL: str
     EMBEDDING_MODEL_PROVIDER: str
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "embedding_cache/embeddings.sqlite"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 4096
+    EMBEDDING_CACHE_DTYPE: str = "float32"
+    EMBEDDING_BATCH_ENABLED: bool = True
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+    EMBEDDING_BATCH_MAX_SIZE: int = 256
+    EMBEDDING_BATCH_MAX_CONCURRENCY: int = 4
+    CONTEXT_TOKENIZER_ENCODING: str = "o200k_base"
+    CONTEXT_MAX_TOKENS_ITEMS: int = 1500
+    CONTEXT_MAX_CHUNK_TOKENS: int = 300
+    CONTEXT_DEDUP_THRESHOLD: float = 0.85
 
     model_config = SettingsConfigDict(env_file=".env")
 
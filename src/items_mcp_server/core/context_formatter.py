@@ -0,0 +1,183 @@
+import logging
+import re
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class ContextFormatter:
+    """Formats retrieved chunks for a tool output within a token budget.
+
+    Chunks are taken in rank order: chunks longer than `max_chunk_tokens` are truncated,
+    chunks that are near-duplicates of an already included chunk (word 3-gram Jaccard
+    similarity of at least `dedup_threshold`) are dropped, and so are chunks that no
+    longer fit into `max_tokens`. Tokens are counted with the local tiktoken `encoding`.
+    If the encoding cannot be loaded, tokens are estimated as four characters each.
+    """
+
+    def __init__(self, max_tokens: int = 2000, max_chunk_tokens: int = 300, dedup_threshold: float = 0.85, encoding: str = "o200k_base"):
+        self.max_tokens = max_tokens
+        self.max_chunk_tokens = max_chunk_tokens
+        self.dedup_threshold = dedup_threshold
+        self.encoding_name = encoding
+
+        self._encoding = None
+        self._encoding_loaded = False
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.original_tokens = 0
+        self.formatted_tokens = 0
+        self.truncated_chunks = 0
+        self.duplicate_chunks = 0
+        self.dropped_chunks = 0
+
+    def _get_encoding(self):
+        if not self._encoding_loaded:
+            with self._lock:
+                if not self._encoding_loaded:
+                    try:
+                        import tiktoken
+                        self._encoding = tiktoken.get_encoding(self.encoding_name)
+                    except Exception as e:
+                        logger.warning(f"Could not load tokenizer {self.encoding_name}, estimating tokens from characters: {e}")
+                    self._encoding_loaded = True
+
+        return self._encoding
+
+    def count_tokens(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is None:
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        encoding = self._get_encoding()
+        if encoding is None:
+            return text[:max_tokens * 4].rstrip() + "..."
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode(tokens[:max_tokens]).rstrip() + "..."
+
+    @staticmethod
+    def shingles(text: str) -> set:
+        words = WORD_PATTERN.findall(text.lower())
+        if len(words) < 3:
+            return {tuple(words)}
+        return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+    def is_near_duplicate(self, shingles: set, seen: list[set]) -> bool:
+        for other in seen:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.dedup_threshold:
+                return True
+        return False
+
+    def select(self, ids: list[str], chunks: list[str], line_overhead: int = 0) -> tuple[list[tuple[str, str]], dict]:
+        """Pick the (id, chunk) pairs that go into the output, in rank order.
+
+        Args:
+            ids: The IDs of the chunks
+            chunks: The retrieved chunks, best match first
+            line_overhead: Tokens added per chunk by the output format
+
+        Returns:
+            The selected (id, chunk) pairs and the formatting stats of this call.
+        """
+
+        selected = []
+        seen = []
+        used_tokens = 0
+        original_tokens = 0
+        truncated = duplicates = dropped = 0
+
+        for id, chunk in zip(ids, chunks):
+            chunk_tokens = self.count_tokens(chunk)
+            original_tokens += chunk_tokens + self.count_tokens(str(id)) + line_overhead
+
+            shingles = self.shingles(chunk)
+            if self.is_near_duplicate(shingles, seen):
+                duplicates += 1
+                continue
+
+            if chunk_tokens > self.max_chunk_tokens:
+                chunk = self.truncate(chunk, self.max_chunk_tokens)
+                chunk_tokens = self.count_tokens(chunk)
+                truncated += 1
+
+            cost = chunk_tokens + self.count_tokens(str(id)) + line_overhead
+            if used_tokens + cost > self.max_tokens:
+                dropped += 1
+                continue
+
+            selected.append((id, chunk))
+            seen.append(shingles)
+            used_tokens += cost
+
+        stats = {
+            "chunks": len(chunks),
+            "selected_chunks": len(selected),
+            "truncated_chunks": truncated,
+            "duplicate_chunks": duplicates,
+            "dropped_chunks": dropped,
+            "original_tokens": original_tokens,
+        }
+
+        return selected, stats
+
+    def _record(self, stats: dict, formatted_context: str) -> dict:
+        stats["formatted_tokens"] = self.count_tokens(formatted_context)
+        stats["tokens_saved"] = max(stats["original_tokens"] - stats["formatted_tokens"], 0)
+
+        with self._lock:
+            self.calls += 1
+            self.original_tokens += stats["original_tokens"]
+            self.formatted_tokens += stats["formatted_tokens"]
+            self.truncated_chunks += stats["truncated_chunks"]
+            self.duplicate_chunks += stats["duplicate_chunks"]
+            self.dropped_chunks += stats["dropped_chunks"]
+
+        logger.info(
+            f"Formatted {stats['selected_chunks']}/{stats['chunks']} chunks in {stats['formatted_tokens']} tokens "
+            f"({stats['tokens_saved']} tokens saved)"
+        )
+
+        return stats
+
+    def format_items(self, ids: list[str], chunks: list[str]) -> tuple[str, dict]:
+        """Format item chunks as `- {id}: {chunk}` lines."""
+
+        selected, stats = self.select(ids, chunks, line_overhead=3)
+        formatted_context = "".join(f"- {id}: {chunk}\n" for id, chunk in selected)
+
+        return formatted_context, self._record(stats, formatted_context)
+
+    def format_grouped(self, ids: list[str], chunks: list[str]) -> tuple[str, dict]:
+        """Format chunks grouped under their ID, so an ID shared by many chunks (e.g. reviews of one item) is written once."""
+
+        selected, stats = self.select(ids, chunks, line_overhead=2)
+
+        groups = {}
+        for id, chunk in selected:
+            groups.setdefault(id, []).append(chunk)
+
+        formatted_context = "".join(
+            f"- {id}:\n" + "".join(f"  - {chunk}\n" for chunk in group)
+            for id, group in groups.items()
+        )
+
+        return formatted_context, self._record(stats, formatted_context)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "original_tokens": self.original_tokens,
+                "formatted_tokens": self.formatted_tokens,
+                "tokens_saved": max(self.original_tokens - self.formatted_tokens, 0),
+                "truncated_chunks": self.truncated_chunks,
+                "duplicate_chunks": self.duplicate_chunks,
+                "dropped_chunks": self.dropped_chunks,
+            }
@@ -1,45 +1,151 @@
+import asyncio
+import logging
+
 import openai
-from qdrant_client import QdrantClient
 from qdrant_client.models import Filter, FieldCondition, MatchText, Prefetch, FusionQuery
 
 from src.items_mcp_server.core.config import config
+from src.items_mcp_server.core.qdrant import get_qdrant_client, dense_search_params
+from src.items_mcp_server.core.embedding_cache import EmbeddingCache
+from src.items_mcp_server.core.embedding_batcher import EmbeddingBatcher
+from src.items_mcp_server.core.sparse_encoder import BM25SparseEncoder
+from src.items_mcp_server.core.context_formatter import ContextFormatter
+
 
+logger = logging.getLogger(__name__)
 
-def get_embedding(text, model=config.EMBEDDING_MODEL):
+
+def embed_texts(texts, model=config.EMBEDDING_MODEL):
     response = openai.embeddings.create(
-        input=[text],
+        input=texts,
         model=model,
     )
 
-    return response.data[0].embedding
+    return [item.embedding for item in response.data], response.usage.total_tokens
+
+
+embedding_cache = EmbeddingCache(
+    path=config.EMBEDDING_CACHE_PATH,
+    max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+    dtype=config.EMBEDDING_CACHE_DTYPE
+) if config.EMBEDDING_CACHE_ENABLED else None
+
+embedding_batcher = EmbeddingBatcher(
+    embed_texts,
+    window_ms=config.EMBEDDING_BATCH_WINDOW_MS,
+    max_batch_size=config.EMBEDDING_BATCH_MAX_SIZE,
+    max_concurrency=config.EMBEDDING_BATCH_MAX_CONCURRENCY
+) if config.EMBEDDING_BATCH_ENABLED else None
+
+sparse_encoder = BM25SparseEncoder()
+
+item_context_formatter = ContextFormatter(
+    max_tokens=config.CONTEXT_MAX_TOKENS_ITEMS,
+    max_chunk_tokens=config.CONTEXT_MAX_CHUNK_TOKENS,
+    dedup_threshold=config.CONTEXT_DEDUP_THRESHOLD,
+    encoding=config.CONTEXT_TOKENIZER_ENCODING
+)
+
+
+async def aget_embedding(text, model=config.EMBEDDING_MODEL):
+    """Embed the query without blocking the event loop.
+
+    Concurrent tool calls wait on the shared batcher together, so their cache misses
+    go out as one embeddings request. Cache lookups and writes can hit SQLite, so they
+    run on a worker thread.
+    """
+    if embedding_cache is not None:
+        cached_embedding = await asyncio.to_thread(embedding_cache.get, model, text)
+        if cached_embedding is not None:
+            return cached_embedding.tolist()
+
+    if embedding_batcher is not None:
+        embedding, _ = await embedding_batcher.aembed(text, model)
+    else:
+        embeddings, _ = await asyncio.to_thread(embed_texts, [text], model)
+        embedding = embeddings[0]
+
+    if embedding_cache is not None:
+        await asyncio.to_thread(embedding_cache.put, model, text, embedding)
+
+    return embedding
 
 
 ### Items Tool ###
 
 
-def retrieve_item_context(query, top_k=5):
-    query_embedding = get_embedding(query)
+sparse_vector_checks = {}
 
-    qdrant_client = QdrantClient(url=config.QDRANT_URL)
 
-    results = qdrant_client.query_points(
+def sparse_vector_available(collection_name, vector_name) -> bool:
+    """Whether the collection has the sparse vector, looked up once per collection.
+
+    A failed lookup is not remembered, so the next query checks again.
+    """
+    key = (collection_name, vector_name)
+    if key not in sparse_vector_checks:
+        try:
+            collection = get_qdrant_client().get_collection(collection_name)
+        except Exception as e:
+            logger.warning(f"Could not check {collection_name} for the sparse vector {vector_name}: {e}")
+            return False
+
+        sparse_vector_checks[key] = vector_name in (collection.config.params.sparse_vectors or {})
+        if not sparse_vector_checks[key]:
+            logger.warning(
+                f"Collection {collection_name} has no sparse vector {vector_name}, falling back to the full-text filter. "
+                f"Copy it with ingestion.sparse_vectors and point QDRANT_COLLECTION_NAME_ITEMS at the copy."
+            )
+
+    return sparse_vector_checks[key]
+
+
+def keyword_prefetch(query, limit=20):
+    """Keyword leg of the hybrid search.
+
+    By default (`KEYWORD_RETRIEVAL_MODE=text_filter`) this is the unranked full-text
+    filter, which works on every items collection. With `bm25` it is a ranked search on
+    the collection's BM25 sparse vector, as long as the collection has that vector.
+    """
+
+    if config.KEYWORD_RETRIEVAL_MODE == "bm25" and sparse_vector_available(config.QDRANT_COLLECTION_NAME_ITEMS, config.QDRANT_SPARSE_VECTOR_NAME):
+        return Prefetch(
+            query=sparse_encoder.encode_query(query),
+            using=config.QDRANT_SPARSE_VECTOR_NAME,
+            limit=limit
+        )
+
+    return Prefetch(
+        filter=Filter(
+            must=[
+                FieldCondition(
+                    key="text",
+                    match=MatchText(text=query)
+                )
+            ]
+        ),
+        limit=limit
+    )
+
+
+async def retrieve_item_context(query, top_k=5):
+    query_embedding = await aget_embedding(query)
+
+    qdrant_client = get_qdrant_client()
+
+    # The first BM25 query checks the collection for the sparse vector, keep that off the event loop.
+    keyword_leg = await asyncio.to_thread(keyword_prefetch, query, 20)
+
+    results = await asyncio.to_thread(
+        qdrant_client.query_points,
         collection_name=config.QDRANT_COLLECTION_NAME_ITEMS,
         prefetch=[
             Prefetch(
                 query=query_embedding,
+                params=dense_search_params(),
                 limit=20
             ),
-            Prefetch(
-                filter=Filter(
-                    must=[
-                        FieldCondition(
-                            key="text",
-                            match=MatchText(text=query)
-                        )
-                    ]
-                ),
-                limit=20
-            )
+            keyword_leg
         ],
         query=FusionQuery(fusion="rrf"),
         limit=top_k
@@ -64,9 +170,6 @@ def retrieve_item_context(query, top_k=5):
 
 def process_item_context(context):
 
-    formatted_context = ""
-
-    for id, chunk in zip(context["retrieved_context_ids"], context["retrieved_context"]):
-        formatted_context += f"- {id}: {chunk}\n"
+    formatted_context, _ = item_context_formatter.format_items(context["retrieved_context_ids"], context["retrieved_context"])
 
     return formatted_context
\ No newline at end of file
@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize query text so trivially different spellings share a cache entry."""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: an in-process LRU in front of a persistent SQLite store.
+
+    Vectors are kept as compact numpy arrays (float32 or float16) in both tiers.
+    The SQLite file can be put on a volume shared by several services, WAL mode
+    allows concurrent readers and writers from different processes.
+
+    The lock only guards the in-memory tier. Every thread gets its own SQLite
+    connection, so disk reads and writes never hold up lookups in other threads.
+    """
+
+    def __init__(self, path: str = "", max_entries: int = 4096, dtype: str = "float32"):
+        self.path = path
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        self._disk_enabled = False
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+
+        if path:
+            self._open_disk_tier(path)
+
+    def _open_disk_tier(self, path: str):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    dtype TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            self._disk_enabled = True
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache disk tier disabled, could not open {path}: {e}")
+            self._disk_enabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _connection(self) -> sqlite3.Connection | None:
+        """The SQLite connection of the calling thread, opened on first use."""
+        if not self._disk_enabled:
+            return None
+        conn = getattr(self._local, "conn", None)
+        return conn if conn is not None else self._connect()
+
+    def get(self, model: str, text: str):
+        key = cache_key(model, text)
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+        vector = self._disk_get(key)
+
+        with self._lock:
+            if vector is not None:
+                self.disk_hits += 1
+                self._memory_put(key, vector)
+                return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, embedding) -> np.ndarray:
+        key = cache_key(model, text)
+        vector = np.asarray(embedding, dtype=self.dtype)
+
+        with self._lock:
+            self._memory_put(key, vector)
+            self.writes += 1
+
+        self._disk_put(key, model, vector)
+
+        return vector
+
+    def _memory_put(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str):
+        conn = self._connection()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT dtype, vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache disk read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return np.frombuffer(row[1], dtype=row[0]).astype(self.dtype, copy=False)
+
+    def _disk_put(self, key: str, model: str, vector: np.ndarray):
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, model, dtype, dim, vector, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, vector.dtype.str, vector.shape[0], vector.tobytes(), time.time()),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache disk write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+        conn = self._connection()
+        if conn is not None:
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_max_entries": self.max_entries,
+                "disk_enabled": self._disk_enabled,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "writes": self.writes,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._disk_enabled = False
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -1,10 +1,11 @@
 from fastmcp import FastMCP
+from src.reviews_mcp_server.core.qdrant import close_qdrant_client
 from src.reviews_mcp_server.utils import retrieve_review_context, process_review_context
 
 mcp = FastMCP("reviews")
 
 @mcp.tool()
-def get_formatted_review_context(query: str, item_list: list[str], top_k: int = 20) -> str:
+async def get_formatted_review_context(query: str, item_list: list[str], top_k: int = 20) -> str:
 
     """Get the top k reviews matching a query for a list of prefiltered items.
     
@@ -17,11 +18,14 @@ def get_formatted_review_context(query: str, item_list: list[str], top_k: int =
         A string of the top k context chunks with IDs prepending each chunk, each representing an inventory item for a given query.
     """
 
-    context = retrieve_review_context(query, item_list, top_k)
+    context = await retrieve_review_context(query, item_list, top_k)
     formatted_context = process_review_context(context)
 
     return formatted_context
 
 
 if __name__ == "__main__":
-    mcp.run(transport='http', host="0.0.0.0", port=8000)
\ No newline at end of file
+    try:
+        mcp.run(transport='http', host="0.0.0.0", port=8000)
+    finally:
+        close_qdrant_client()
\ No newline at end of file
@@ -1,31 +1,83 @@
+import asyncio
+
 import openai
-from qdrant_client import QdrantClient
 from qdrant_client.models import Filter, FieldCondition, MatchAny, Prefetch, FusionQuery
 
 from src.reviews_mcp_server.core.config import config
+from src.reviews_mcp_server.core.qdrant import get_qdrant_client, dense_search_params
+from src.reviews_mcp_server.core.embedding_cache import EmbeddingCache
+from src.reviews_mcp_server.core.embedding_batcher import EmbeddingBatcher
+from src.reviews_mcp_server.core.context_formatter import ContextFormatter
 
 
-def get_embedding(text, model=config.EMBEDDING_MODEL):
+def embed_texts(texts, model=config.EMBEDDING_MODEL):
     response = openai.embeddings.create(
-        input=[text],
+        input=texts,
         model=model,
     )
 
-    return response.data[0].embedding
+    return [item.embedding for item in response.data], response.usage.total_tokens
+
+
+embedding_cache = EmbeddingCache(
+    path=config.EMBEDDING_CACHE_PATH,
+    max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+    dtype=config.EMBEDDING_CACHE_DTYPE
+) if config.EMBEDDING_CACHE_ENABLED else None
+
+embedding_batcher = EmbeddingBatcher(
+    embed_texts,
+    window_ms=config.EMBEDDING_BATCH_WINDOW_MS,
+    max_batch_size=config.EMBEDDING_BATCH_MAX_SIZE,
+    max_concurrency=config.EMBEDDING_BATCH_MAX_CONCURRENCY
+) if config.EMBEDDING_BATCH_ENABLED else None
+
+review_context_formatter = ContextFormatter(
+    max_tokens=config.CONTEXT_MAX_TOKENS_REVIEWS,
+    max_chunk_tokens=config.CONTEXT_MAX_CHUNK_TOKENS,
+    dedup_threshold=config.CONTEXT_DEDUP_THRESHOLD,
+    encoding=config.CONTEXT_TOKENIZER_ENCODING
+)
+
+
+async def aget_embedding(text, model=config.EMBEDDING_MODEL):
+    """Embed the query without blocking the event loop.
+
+    Concurrent tool calls wait on the shared batcher together, so their cache misses
+    go out as one embeddings request. Cache lookups and writes can hit SQLite, so they
+    run on a worker thread.
+    """
+    if embedding_cache is not None:
+        cached_embedding = await asyncio.to_thread(embedding_cache.get, model, text)
+        if cached_embedding is not None:
+            return cached_embedding.tolist()
+
+    if embedding_batcher is not None:
+        embedding, _ = await embedding_batcher.aembed(text, model)
+    else:
+        embeddings, _ = await asyncio.to_thread(embed_texts, [text], model)
+        embedding = embeddings[0]
+
+    if embedding_cache is not None:
+        await asyncio.to_thread(embedding_cache.put, model, text, embedding)
+
+    return embedding
 
 
 ### Reviews Tool ###
 
-def retrieve_review_context(query, item_list, top_k=20):
-    query_embedding = get_embedding(query)
+async def retrieve_review_context(query, item_list, top_k=20):
+    query_embedding = await aget_embedding(query)
 
-    qdrant_client = QdrantClient(url=config.QDRANT_URL)
+    qdrant_client = get_qdrant_client()
 
-    results = qdrant_client.query_points(
+    results = await asyncio.to_thread(
+        qdrant_client.query_points,
         collection_name=config.QDRANT_COLLECTION_NAME_REVIEWS,
         prefetch=[
             Prefetch(
                 query=query_embedding,
+                params=dense_search_params(),
                 filter=Filter(
                     must=[
                         FieldCondition(
@@ -58,9 +110,6 @@ def retrieve_review_context(query, item_list, top_k=20):
 
 def process_review_context(context):
 
-    formatted_context = ""
-
-    for id, chunk in zip(context["retrieved_context_ids"], context["retrieved_context"]):
-        formatted_context += f"- {id}: {chunk}\n"
+    formatted_context, _ = review_context_formatter.format_grouped(context["retrieved_context_ids"], context["retrieved_context"])
 
     return formatted_context
\ No newline at end of file